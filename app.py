@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.settings_manager import load_settings
+from utils.sheet_refresher import start_sheet_refresher
+from components.debug_panel import start_metrics_export
 from components.auth import render_login_form
 from components.navigation import render_navigation
 
@@ -10,6 +11,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Start the background sheet refresher (once per server process)
+start_sheet_refresher()
+start_metrics_export()
+
 # Custom CSS to set fonts
 custom_css = """
     <style>
@@ -53,10 +58,30 @@ is_authenticated = render_login_form()
 if is_authenticated:
     # Initialize global settings after login
     if not st.session_state.get('settings_initialized', False):
+        # The sheet pipeline (pandas, Google clients) is only needed once logged in
+        from utils.settings_manager import load_settings
+        from utils.gsheets import build_range_name, register_sheet_range
+
         st.session_state.alerts_settings = load_settings('alerts')
         st.session_state.signals_settings = load_settings('signals')
         st.session_state.settings_initialized = True
 
+        # Register both pages' ranges so the first load fetches them in one batch
+        for page_settings, incremental in (
+            (st.session_state.alerts_settings, True),
+            (st.session_state.signals_settings, False)
+        ):
+            register_sheet_range(
+                page_settings['spreadsheet_id'],
+                build_range_name(
+                    page_settings['sheet_name'], page_settings['start_col'],
+                    page_settings['start_row'], page_settings['end_col'],
+                    # The append-only alert log is read to its last row
+                    None if incremental else page_settings['end_row']
+                ),
+                incremental=incremental
+            )
+
     # Render navigation
     render_navigation()
 
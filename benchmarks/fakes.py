@@ -0,0 +1,173 @@
+"""Local stand-ins for the Google Sheets/Drive APIs and the Postgres database.
+
+The fakes expose only the surface the app calls, and can add a fixed delay
+per call to model network round trips.
+"""
+import json
+import re
+import time
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+RANGE_PATTERN = re.compile(r"^'?(.+?)'?!([A-Z]+)(\d+):([A-Z]+)(\d*)$")
+
+class FakeRequest:
+    """Mimics a googleapiclient HttpRequest: the response is built on execute()."""
+
+    def __init__(self, respond, latency):
+        self.respond = respond
+        self.latency = latency
+
+    def execute(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond()
+
+class FakeSheetsService:
+    """Serves in-memory sheets through spreadsheets().get and values().get/batchGet.
+
+    `sheets` maps sheet titles to API-style values: a header row followed by
+    data rows. The same sheets are served for every spreadsheet ID.
+    """
+
+    def __init__(self, sheets, latency=0.0):
+        self.sheets = sheets
+        self.latency = latency
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId=None, range=None, fields=None, **kwargs):
+        if range is None:
+            self.calls.append(('spreadsheets.get', spreadsheetId))
+            return FakeRequest(self.metadata, self.latency)
+
+        self.calls.append(('values.get', spreadsheetId, range))
+        return FakeRequest(lambda: {'range': range, 'values': self.range_values(range)}, self.latency)
+
+    def batchGet(self, spreadsheetId=None, ranges=(), **kwargs):
+        self.calls.append(('values.batchGet', spreadsheetId, tuple(ranges)))
+        return FakeRequest(
+            lambda: {'valueRanges': [{'range': name, 'values': self.range_values(name)} for name in ranges]},
+            self.latency
+        )
+
+    def metadata(self):
+        return {
+            'sheets': [
+                {
+                    'properties': {
+                        'title': title,
+                        'sheetId': sheet_id,
+                        'gridProperties': {
+                            'rowCount': len(values),
+                            'columnCount': len(values[0]) if values else 0
+                        }
+                    }
+                }
+                for sheet_id, (title, values) in enumerate(self.sheets.items())
+            ]
+        }
+
+    def range_values(self, range_name):
+        """Rows of an A1 range such as 'SIGNALS'!A1:T1000 (the end row may be omitted)."""
+        match = RANGE_PATTERN.match(range_name)
+        if not match:
+            raise ValueError(f"Unsupported range: {range_name}")
+        title, _, start_row, _, end_row = match.groups()
+        values = self.sheets.get(title, [])
+        end = int(end_row) if end_row else len(values)
+        return values[int(start_row) - 1:end]
+
+class FakeDriveService:
+    """Answers files().get revision lookups with a fixed version."""
+
+    def __init__(self, version='1', latency=0.0):
+        self.version = version
+        self.latency = latency
+
+    def files(self):
+        return self
+
+    def get(self, fileId=None, fields=None, **kwargs):
+        return FakeRequest(
+            lambda: {'version': self.version, 'modifiedTime': '2025-01-01T00:00:00.000Z'},
+            self.latency
+        )
+
+class FakeDatabase:
+    """In-memory user_preferences table reached through psycopg2-like connections."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.preferences = {}
+        self.queries = 0
+
+    def connect(self):
+        return FakeConnection(self)
+
+class FakeCursor:
+    """Runs the handful of statements the settings code issues."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        database = self.connection.database
+        database.queries += 1
+        if database.latency:
+            time.sleep(database.latency)
+
+        self.connection.status = TRANSACTION_STATUS_INTRANS
+        sql = ' '.join(query.split()).upper()
+        if sql.startswith('SELECT SETTINGS'):
+            user_id, page = params
+            settings = database.preferences.get((user_id, page))
+            self.result = {'settings': json.loads(settings)} if settings is not None else None
+        elif sql.startswith('INSERT INTO USER_PREFERENCES'):
+            user_id, page, settings = params
+            self.connection.pending[(user_id, page)] = settings
+            self.result = {'user_id': user_id}
+        elif sql.startswith('SELECT 1'):
+            self.result = {'?column?': 1}
+        else:
+            raise NotImplementedError(f"FakeDatabase does not support: {sql[:60]}")
+
+    def fetchone(self):
+        return self.result
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.pending = {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.database.preferences.update(self.pending)
+        self.pending = {}
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.pending = {}
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
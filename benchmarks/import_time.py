@@ -0,0 +1,128 @@
+"""Import-time profile of the app's entry points.
+
+Imports the modules each entry point loads before its first paint in a
+fresh interpreter under `python -X importtime`, and prints the totals, the
+heaviest top-level packages and which heavy dependencies were loaded as JSON:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 5 --top 15 --output imports.json
+
+Only imports on the script thread are measured; the sheet refresher thread
+loads the sheet pipeline in the background.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported before each entry point renders, in import order
+ENTRY_POINTS = {
+    'streamlit': ['streamlit'],
+    'app_logged_out': [
+        'streamlit', 'utils.sheet_refresher', 'components.debug_panel',
+        'components.auth', 'components.navigation'
+    ],
+    'page_logged_out': ['streamlit', 'utils.sheet_refresher', 'components.debug_panel', 'utils.auth'],
+    'page_logged_in': [
+        'streamlit', 'utils.sheet_refresher', 'components.debug_panel', 'utils.auth',
+        'utils.gsheets', 'utils.data_operations', 'utils.settings_manager', 'utils.database',
+        'utils.symbol_registry', 'components.data_table', 'components.filters', 'components.navigation'
+    ]
+}
+
+# Dependencies the logged out entry points should not load
+HEAVY_PACKAGES = ('pandas', 'numpy', 'pyarrow', 'googleapiclient', 'google_auth_httplib2', 'twilio')
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def profile_imports(modules):
+    """Import modules in a fresh interpreter; returns (wall seconds, [(name, depth, self_us, cumulative_us)])."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', '; '.join(f'import {module}' for module in modules)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {modules} failed:\n{completed.stderr[-2000:]}")
+
+    records = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # Nested imports are indented two spaces per level below the first
+            records.append((name, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return wall, records
+
+def summarize_entry(name, modules, repeat, top):
+    """Median import totals of one entry point, with its heaviest packages."""
+    walls = []
+    totals = []
+    for _ in range(repeat):
+        wall, records = profile_imports(modules)
+        walls.append(wall)
+        totals.append(sum(cumulative for _, depth, _, cumulative in records if depth == 0))
+
+    # Attribute each module's own time to its top-level package
+    package_times = defaultdict(int)
+    for module, _, self_us, _ in records:
+        package_times[module.split('.')[0]] += self_us
+    loaded = {module.split('.')[0] for module, _, _, _ in records}
+
+    return {
+        'entry_point': name,
+        'modules': modules,
+        'repeat': repeat,
+        'import_ms': round(statistics.median(totals) / 1000, 1),
+        'interpreter_ms': round(statistics.median(walls) * 1000, 1),
+        'heavy_packages': [package for package in HEAVY_PACKAGES if package in loaded],
+        'top_packages': [
+            {'package': package, 'self_ms': round(self_us / 1000, 1)}
+            for package, self_us in sorted(package_times.items(), key=lambda item: -item[1])[:top]
+        ]
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entry-points', nargs='+', default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per entry point")
+    parser.add_argument('--top', type=int, default=10, help="Heaviest packages listed per entry point")
+    parser.add_argument('--output', help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = []
+    for name in args.entry_points:
+        print(f"Profiling imports of {name}...", file=sys.stderr)
+        results.append(summarize_entry(name, ENTRY_POINTS[name], args.repeat, args.top))
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
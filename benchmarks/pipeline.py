@@ -0,0 +1,234 @@
+"""Offline benchmark of the sheet load -> filter -> sort -> style pipeline.
+
+Runs the app's own code paths against local fakes of Google Sheets, Drive
+and Postgres, and prints the timings as JSON:
+
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --rows 1000 100000 1000000 --repeat 3 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+# Snapshots are written to a scratch directory, never to the app's data folder
+SNAPSHOT_DIR = tempfile.mkdtemp(prefix='sheet-benchmark-')
+os.environ['SNAPSHOT_DIR'] = SNAPSHOT_DIR
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import streamlit.logger
+from streamlit import config as streamlit_config
+
+# Running outside `streamlit run` makes Streamlit warn on every cache and session call
+streamlit_config.get_config_options()
+streamlit_config.set_option('global.showWarningOnDirectExecution', False)
+streamlit.logger.set_log_level('error')
+
+from benchmarks.fakes import FakeDatabase, FakeDriveService, FakeSheetsService
+from benchmarks.synthetic import SHEET_GENERATORS, column_letter
+from components.data_table import apply_conditional_formatting, column_styles
+from utils import database, gsheets, settings_manager
+from utils.data_operations import build_view, filter_dataframe, sort_dataframe
+from utils.snapshot_cache import ARTIFACTS_LOCK, PUBLISHED_LOCK, PUBLISHED_SNAPSHOTS, SNAPSHOT_ARTIFACTS
+from utils.view_cache import VIEW_CACHE
+
+DEFAULT_ROWS = [1000, 100000, 1000000]
+
+# Representative filters and sorts, as set through the page widgets
+SHEET_FILTERS = {
+    'ALERTS': {
+        'Ticker': 'S00001',
+        'Description': ['TPI Slope Up', 'Bullish TPI flip'],
+        'Date': (date(2021, 1, 1), date(2023, 12, 31))
+    },
+    'SIGNALS': {
+        'Ticker': '.L',
+        'Last TPI Flip': ['Bullish'],
+        'TPI Slope': (-5.0, 15.0),
+        'Quad for this Qtr': (1.0, 2.0)
+    }
+}
+SHEET_SORTS = {
+    'ALERTS': ('Date', False),
+    'SIGNALS': ('TPI Slope', False)
+}
+
+def summarize(stage, samples, **labels):
+    """Timing summary of one stage in milliseconds."""
+    millis = [sample * 1000 for sample in samples]
+    return {
+        **labels,
+        'stage': stage,
+        'repeat': len(millis),
+        'min_ms': round(min(millis), 3),
+        'median_ms': round(statistics.median(millis), 3),
+        'mean_ms': round(statistics.fmean(millis), 3),
+        'max_ms': round(max(millis), 3)
+    }
+
+def measure(stage, run, repeat, setup=None, **labels):
+    """Time run() repeat times, calling setup() untimed before each run."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return summarize(stage, samples, **labels)
+
+def drop_memory_caches():
+    """Forget published snapshots and everything derived from them."""
+    with PUBLISHED_LOCK:
+        PUBLISHED_SNAPSHOTS.clear()
+    with ARTIFACTS_LOCK:
+        SNAPSHOT_ARTIFACTS.clear()
+    VIEW_CACHE.clear()
+
+def drop_all_caches():
+    """Forget in-memory state and delete on-disk snapshots, forcing a refetch."""
+    drop_memory_caches()
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+def drop_sort_orders():
+    """Forget cached sort permutations only."""
+    with ARTIFACTS_LOCK:
+        for key in [key for key in SNAPSHOT_ARTIFACTS if key[2][0] == 'sort_order']:
+            del SNAPSHOT_ARTIFACTS[key]
+
+def style_matrix(df):
+    """Compute the conditional-formatting styles of every cell."""
+    return np.column_stack([column_styles(df.iloc[:, position], str(col)) for position, col in enumerate(df.columns)])
+
+def benchmark_sheet(sheet_name, rows, args):
+    """Time every pipeline stage for one synthetic sheet."""
+    labels = {'sheet': sheet_name, 'rows': rows}
+    values = SHEET_GENERATORS[sheet_name](rows, seed=args.seed)
+    sheets_service = FakeSheetsService({sheet_name: values}, latency=args.api_latency / 1000)
+    drive_service = FakeDriveService(latency=args.api_latency / 1000)
+    gsheets.get_google_clients = lambda: (sheets_service, drive_service)
+
+    spreadsheet_id = f"benchmark-{sheet_name.lower()}-{rows}"
+    range_name = gsheets.build_range_name(sheet_name, 'A', 1, column_letter(len(values[0])), rows + 1)
+    incremental = sheet_name == 'ALERTS'
+
+    def load():
+        return gsheets.load_sheet_data(spreadsheet_id, range_name, incremental)
+
+    results = [
+        measure('load_fetch', load, args.repeat, setup=drop_all_caches, **labels),
+        measure('load_disk', load, args.repeat, setup=drop_memory_caches, **labels),
+        measure('load_published', load, args.repeat, **labels)
+    ]
+
+    df = load()
+    filters = SHEET_FILTERS[sheet_name]
+    sort_by, ascending = SHEET_SORTS[sheet_name]
+    filtered = filter_dataframe(df, filters)
+    view = build_view(df, filters, sort_by, ascending)
+    page = view.iloc[:args.page_rows]
+
+    results += [
+        measure('filter', lambda: filter_dataframe(df, filters), args.repeat, **labels),
+        measure('sort_cold', lambda: sort_dataframe(df, sort_by, ascending), args.repeat, setup=drop_sort_orders, **labels),
+        measure('sort_warm', lambda: sort_dataframe(df, sort_by, ascending), args.repeat, **labels),
+        measure('sort_filtered', lambda: sort_dataframe(filtered, sort_by, ascending), args.repeat, **labels),
+        measure('view_miss', lambda: build_view(df, filters, sort_by, ascending), args.repeat, setup=VIEW_CACHE.clear, **labels),
+        measure('view_hit', lambda: build_view(df, filters, sort_by, ascending), args.repeat, **labels),
+        # Styler defers styling until render; _compute() is what rendering runs
+        measure('format_page', lambda: apply_conditional_formatting(page)._compute(), args.repeat, **labels),
+        measure('style_matrix', lambda: style_matrix(df), args.repeat, **labels)
+    ]
+    for result in results:
+        result['result_rows'] = len(view)
+    return results
+
+def benchmark_settings(args):
+    """Time settings persistence against the database stand-in."""
+    fake_db = FakeDatabase(latency=args.db_latency / 1000)
+    database.CONNECTION_POOL = database.ConnectionPool(
+        fake_db.connect,
+        database.DB_POOL_MAX_SIZE,
+        database.DB_POOL_IDLE_TIMEOUT,
+        database.DB_POOL_ACQUIRE_TIMEOUT,
+        database.DB_POOL_CHECK_AFTER
+    )
+    st.session_state['user_id'] = 1
+    settings = settings_manager.get_default_settings('signals')
+    counter = iter(range(sys.maxsize))
+
+    def save_changed():
+        settings_manager.save_settings({**settings, 'end_row': next(counter)}, 'signals')
+
+    def save_unchanged():
+        settings_manager.save_settings(settings, 'signals')
+
+    # (stage, run, untimed setup before the first run)
+    stages = [
+        ('settings_save', save_changed, None),
+        ('settings_save_unchanged', save_unchanged, save_unchanged),
+        ('settings_load', lambda: settings_manager.load_settings('signals'), None)
+    ]
+    results = []
+    for stage, run, setup in stages:
+        if setup:
+            setup()
+        queries = fake_db.queries
+        result = measure(stage, run, args.repeat, sheet='settings', rows=1)
+        result['queries'] = fake_db.queries - queries
+        results.append(result)
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Sheet sizes in rows")
+    parser.add_argument('--sheets', nargs='+', default=list(SHEET_GENERATORS), choices=list(SHEET_GENERATORS))
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage")
+    parser.add_argument('--page-rows', type=int, default=200, help="Rows styled per page, as max_rows")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="Simulated Google API latency per call (ms)")
+    parser.add_argument('--db-latency', type=float, default=0.0, help="Simulated database latency per query (ms)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = []
+    try:
+        for rows in args.rows:
+            for sheet_name in args.sheets:
+                print(f"Benchmarking {sheet_name} with {rows} rows...", file=sys.stderr)
+                results += benchmark_sheet(sheet_name, rows, args)
+        results += benchmark_settings(args)
+    finally:
+        settings_manager.flush_pending_settings()
+        shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__
+        },
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
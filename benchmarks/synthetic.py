@@ -0,0 +1,105 @@
+"""Synthetic ALERTS and SIGNALS sheets shaped like the live spreadsheet.
+
+Values are generated the way the Sheets API returns them with
+valueRenderOption=UNFORMATTED_VALUE: numbers as numbers, dates as serial
+numbers and empty cells as ''.
+"""
+import numpy as np
+
+from utils.sheet_schemas import SHEET_SCHEMAS
+
+ALERT_NAMES = [f"Alert {i}" for i in range(40)]
+ALERT_DESCRIPTIONS = [
+    "TPI Slope Up", "TPI Slope Down", "Bullish TPI flip", "Bearish TPI flip",
+    "Crossed above MA", "Crossed below MA", "New 52 week high", "New 52 week low"
+]
+FLIP_LABELS = ["Bullish", "Bearish", "Neutral"]
+MOMENTUM_LABELS = ["Slope Up", "Slope Down", "Flat"]
+QUAD_TERRITORIES = ["Quad 1", "Quad 2", "Quad 3", "Quad 4", "Quad 1/2", "Quad 3/4"]
+EXCHANGES = ["", ".L", ".SG", ".DE", ".PA", "-USD"]
+
+# 2020-01-01 as a Google Sheets date serial
+FIRST_SERIAL = 43831
+
+def tickers(rng, rows, unique=None):
+    """Ticker symbols; with unique set, rows are drawn from that many symbols."""
+    count = unique or rows
+    symbols = np.char.add(
+        np.char.add('S', np.char.zfill(np.arange(count).astype(str), 6)),
+        np.array(EXCHANGES)[np.arange(count) % len(EXCHANGES)]
+    )
+    if unique:
+        symbols = symbols[rng.integers(0, count, rows)]
+    return symbols.tolist()
+
+def blank_some(rng, values, share):
+    """Replace a share of the values with empty cells."""
+    values = np.array(values, dtype=object)
+    values[rng.random(len(values)) < share] = ''
+    return values.tolist()
+
+def to_rows(columns):
+    """Turn column lists into API-style rows, dropping trailing empty cells."""
+    rows = [list(row) for row in zip(*columns)]
+    for row in rows:
+        while row and row[-1] == '':
+            row.pop()
+    return rows
+
+def alerts_values(rows, seed=0):
+    """Header plus rows for an ALERTS sheet."""
+    rng = np.random.default_rng(seed)
+    columns = [
+        tickers(rng, rows, unique=max(rows // 20, 1)),
+        np.array(ALERT_NAMES)[rng.integers(0, len(ALERT_NAMES), rows)].tolist(),
+        np.array(ALERT_DESCRIPTIONS)[rng.integers(0, len(ALERT_DESCRIPTIONS), rows)].tolist(),
+        np.round(FIRST_SERIAL + rng.random(rows) * 1800, 5).tolist()
+    ]
+    return [list(SHEET_SCHEMAS['ALERTS'])] + to_rows(columns)
+
+def signals_values(rows, seed=0):
+    """Header plus rows for a SIGNALS sheet."""
+    rng = np.random.default_rng(seed)
+
+    def labels(choices):
+        return np.array(choices)[rng.integers(0, len(choices), rows)].tolist()
+
+    def tpi():
+        return rng.integers(-100, 101, rows).tolist()
+
+    columns = {
+        'Ticker': tickers(rng, rows),
+        'Current TPI Signal': rng.choice([-100, 100], rows).tolist(),
+        'Last TPI Flip': labels(FLIP_LABELS),
+        'Before Last TPI Flip': labels(FLIP_LABELS),
+        '1M Momentum': labels(MOMENTUM_LABELS),
+        'Quad Territory': labels(QUAD_TERRITORIES),
+        'Quad for Last Qtr': blank_some(rng, rng.integers(1, 5, rows).tolist(), 0.05),
+        'Quad for this Qtr': blank_some(rng, rng.integers(1, 5, rows).tolist(), 0.05),
+        'Quad for next Qtr': blank_some(rng, rng.integers(1, 5, rows).tolist(), 0.1),
+        'Quad for Qtr +2': blank_some(rng, rng.integers(1, 5, rows).tolist(), 0.2),
+        'TPI -7': tpi(),
+        'TPI -6': tpi(),
+        'TPI -5': tpi(),
+        'TPI -4': tpi(),
+        'TPI -3': tpi(),
+        'TPI -2': tpi(),
+        'TPI -1': tpi(),
+        'TPI Latest': tpi(),
+        'TPI Slope': np.round(rng.normal(0, 8, rows), 2).tolist(),
+        'TPI MA': np.round(rng.uniform(-98, 100, rows), 2).tolist()
+    }
+    return [list(columns)] + to_rows(columns.values())
+
+SHEET_GENERATORS = {
+    'ALERTS': alerts_values,
+    'SIGNALS': signals_values
+}
+
+def column_letter(number):
+    """Spreadsheet column letter for a 1-based column number."""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
@@ -1,16 +1,15 @@
 import streamlit as st
 from utils.auth import (
-    create_user, authenticate_user, logout_user, is_logged_in,
+    create_user, authenticate_user, is_logged_in, start_session,
     create_password_reset_token, reset_password
 )
+from utils.auth import logout_user as end_session
 
 def logout_user():
     """Log out the current user."""
-    # Clear all session state
-    for key in list(st.session_state.keys()):
-        del st.session_state[key]
-    st.session_state.auth_state = 'login'  # Reset to login state
-    st.experimental_rerun()  # Force the app to rerun and show the login page
+    # Revokes the session token and clears all session state
+    end_session()
+    st.rerun()  # Force the app to rerun and show the login page
 
 def render_login_form():
     """Render the login/signup form."""
@@ -46,8 +45,7 @@ def render_login_form():
             if submit and username and password:
                 success, user_id = authenticate_user(username, password)
                 if success:
-                    st.session_state.user_id = user_id
-                    st.session_state.username = username
+                    start_session(user_id, username)
                     st.session_state.settings_initialized = False
                     st.success("Successfully logged in!")
                     # After login, don't call rerun here, instead change session state and let Streamlit rerun the app naturally
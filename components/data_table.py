@@ -1,56 +1,86 @@
+import math
 import streamlit as st
+import numpy as np
 import pandas as pd
+from utils.metrics import timed
+
+POSITIVE_STYLE = 'color: white; background-color: green'
+NEGATIVE_STYLE = 'color: white; background-color: red'
+
+# Cell styles for the Quad regime values 1-4
+QUAD_STYLES = {
+    1: 'color: white; background-color: green',
+    2: 'color: white; background-color: #FFD700',  # Yellow
+    3: 'color: white; background-color: #FFA500',  # Orange
+    4: 'color: white; background-color: red'
+}
+
+def contains_any(series, indicators):
+    """Vectorized check whether str(value) contains any of the indicators."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Check each category once and map the result back through the codes
+        categories = pd.Series(series.cat.categories.astype(str))
+        matches = np.append(contains_any(categories, indicators), False)
+        return matches[series.cat.codes.to_numpy()]  # Code -1 (missing) hits the False
+
+    text = series.astype(str)
+    mask = np.zeros(len(series), dtype=bool)
+    for indicator in indicators:
+        mask |= text.str.contains(indicator, regex=False).to_numpy()
+    return mask
+
+def as_numbers(series):
+    """Vectorized float(value) for a column, NaN where it would fail."""
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        return np.full(len(series), np.nan)
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    return pd.to_numeric(series.astype(object), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+def column_styles(series, column_name):
+    """Return the style of every cell of a column, classified with masks."""
+    if "Quad for" in column_name:
+        # int(float(value)) truncates towards zero
+        quads = np.trunc(as_numbers(series))
+        value_styles = np.full(len(series), '', dtype=object)
+        for quad, style in QUAD_STYLES.items():
+            value_styles[quads == quad] = style
+    elif "Quad" in column_name:
+        # Skip numeric coloring for columns with "Quad" in their name
+        value_styles = np.full(len(series), '', dtype=object)
+    else:
+        numbers = as_numbers(series)
+        value_styles = np.where(
+            numbers > 0, POSITIVE_STYLE, np.where(numbers < 0, NEGATIVE_STYLE, '')
+        ).astype(object)
+
+    # Numbers and dates never contain the text indicators
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        return value_styles
+
+    # Text indicators take precedence over the value-based styles
+    positive = contains_any(series, ["Slope Up", "Bullish"])
+    negative = contains_any(series, ["Slope Down", "Bearish"]) & ~positive
+    value_styles[positive] = POSITIVE_STYLE
+    value_styles[negative] = NEGATIVE_STYLE
+    return value_styles
 
 def apply_conditional_formatting(df):
     """Apply conditional formatting to the DataFrame."""
-    def color_value(val, column_name):
-        try:
-            # Convert to string for text checks
-            val_str = str(val)
-
-            # Check for text indicators first
-            if any(indicator in val_str for indicator in ["Slope Up", "Bullish"]):
-                return 'color: white; background-color: green'
-            elif any(indicator in val_str for indicator in ["Slope Down", "Bearish"]):
-                return 'color: white; background-color: red'
-
-            # Special handling for Quad columns
-            if "Quad for" in column_name:
-                try:
-                    quad_value = int(float(val))  # Convert to integer
-                    if quad_value == 1:
-                        return 'color: white; background-color: green'
-                    elif quad_value == 2:
-                        return 'color: white; background-color: #FFD700'  # Yellow
-                    elif quad_value == 3:
-                        return 'color: white; background-color: #FFA500'  # Orange
-                    elif quad_value == 4:
-                        return 'color: white; background-color: red'
-                except (ValueError, TypeError):
-                    return ''
-                return ''
-
-            # Skip numeric coloring for columns with "Quad" in their name
-            if "Quad" in column_name:
-                return ''
-
-            # Try to convert to float for numeric comparison
-            val_float = float(val)
-            if val_float > 0:
-                return 'color: white; background-color: green'
-            elif val_float < 0:
-                return 'color: white; background-color: red'
-
-            return ''
-        except (ValueError, TypeError):
-            return ''
-
-    # Create a style function that includes column name information
+    # Build the whole style matrix in one shot, column by column
     def style_function(df):
-        styles = pd.DataFrame('', index=df.index, columns=df.columns)
-        for col in df.columns:
-            styles[col] = df[col].apply(lambda x: color_value(x, col))
-        return styles
+        if df.columns.empty:
+            return pd.DataFrame('', index=df.index, columns=df.columns)
+        # Runs when the Styler is rendered
+        with timed('style_matrix', rows=len(df)):
+            return pd.DataFrame(
+                np.column_stack([
+                    column_styles(df.iloc[:, position], str(col))
+                    for position, col in enumerate(df.columns)
+                ]),
+                index=df.index,
+                columns=df.columns
+            )
 
     # Apply conditional formatting and center alignment
     styled_df = df.style.apply(style_function, axis=None)
@@ -64,8 +94,11 @@ def apply_conditional_formatting(df):
 
     return styled_df
 
-def render_data_table(df, selected_columns):
-    """Render interactive data table with selected columns and conditional formatting."""
+def render_data_table(df, selected_columns, max_rows=None, key="data_table"):
+    """Render interactive data table with selected columns and conditional formatting.
+
+    With max_rows set, only the current page of rows is styled and sent to the browser.
+    """
     if df is None:
         st.warning("No data available to display.")
         return
@@ -75,14 +108,46 @@ def render_data_table(df, selected_columns):
     else:
         df_display = df
 
-    # Apply conditional formatting and center alignment
-    styled_df = apply_conditional_formatting(df_display)
+    total_rows = len(df_display)
+    page_size = int(max_rows) if max_rows else max(total_rows, 1)
+    page_count = max(1, math.ceil(total_rows / page_size))
+
+    page = 1
+    if page_count > 1:
+        page_key = f"{key}_page"
+        # The widget takes its value from session state only, so clamping it
+        # does not conflict with a default value
+        st.session_state.setdefault(page_key, 1)
+        # Keep the stored page in range when filtering shrinks the result
+        if st.session_state[page_key] > page_count:
+            st.session_state[page_key] = page_count
+
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=page_count,
+                step=1,
+                key=page_key
+            )
+        with col2:
+            st.caption(f"{page_count} pages of up to {page_size} rows")
+
+    start = (page - 1) * page_size
+    end = min(start + page_size, total_rows)
+    page_df = df_display.iloc[start:end]
 
-    st.dataframe(
-        styled_df,
-        use_container_width=True,
-        height=800  # Increased from 400 to 800 to show more rows
-    )
+    # Apply conditional formatting and center alignment
+    styled_df = apply_conditional_formatting(page_df)
+
+    with timed('table_render', rows=len(page_df)):
+        st.dataframe(
+            styled_df,
+            use_container_width=True,
+            height=800  # Increased from 400 to 800 to show more rows
+        )
+    st.caption(f"Showing rows {start + 1 if total_rows else 0}–{end} of {total_rows}")
 
 def column_selector(df):
     """Render column selection widget."""
@@ -0,0 +1,58 @@
+import os
+import streamlit as st
+from utils.metrics import (
+    export_json, export_prometheus, get_source_metrics, get_stage_summaries, reset_metrics, start_metrics_server
+)
+
+# Show the panel on every page with DEBUG_PANEL=1, or per visit with ?debug=1
+DEBUG_PANEL = os.getenv('DEBUG_PANEL', '0') == '1'
+
+@st.cache_resource
+def start_metrics_export():
+    """Start the Prometheus /metrics endpoint once per server process (if METRICS_PORT is set)."""
+    return start_metrics_server()
+
+def debug_panel_enabled():
+    """Check whether the timing panel should be shown."""
+    return DEBUG_PANEL or st.query_params.get('debug') == '1'
+
+def render_debug_panel():
+    """Render per-stage timings and pool metrics in the sidebar, with Prometheus and JSON downloads."""
+    if not debug_panel_enabled():
+        return
+
+    with st.sidebar.expander("⏱️ Performance"):
+        # Current values such as connection pool usage
+        for name, values in get_source_metrics().items():
+            if values:
+                st.caption(f"{name}: " + ", ".join(f"{key} {value}" for key, value in values.items()))
+
+        summaries = get_stage_summaries()
+        if not summaries:
+            st.caption("No timings recorded yet.")
+            return
+
+        # Only sessions that show the panel pay for importing pandas
+        import pandas as pd
+
+        timings = pd.DataFrame([
+            {
+                'Stage': stage,
+                'Count': summary['count'],
+                'Mean (ms)': summary['mean'] * 1000,
+                'p50 (ms)': summary['p50'] * 1000,
+                'p95 (ms)': summary['p95'] * 1000,
+                'Max (ms)': summary['max'] * 1000
+            }
+            for stage, summary in summaries.items()
+        ])
+        st.dataframe(timings.round(1), hide_index=True, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Prometheus", export_prometheus(), file_name="metrics.txt", mime="text/plain")
+        with col2:
+            st.download_button("JSON", export_json(), file_name="metrics.json", mime="application/json")
+        if st.button("Reset timings", key="reset_timings"):
+            reset_metrics()
+            st.rerun()
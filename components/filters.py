@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from utils.column_stats import get_column_profile
 
 def render_filters(df, page_context=''):
     """Render filter controls for DataFrame."""
@@ -10,25 +11,31 @@ def render_filters(df, page_context=''):
     settings_key = f"{page_context}_settings" if page_context else "settings"
     saved_filters = st.session_state.get(settings_key, {}).get('filters', {})
 
+    # Widget bounds and options come from the snapshot's cached column profile
+    profile = get_column_profile(df)
+
     with st.expander("Filters"):
+        # Key widgets by snapshot so they keep their values across reruns
+        frame_key = df.attrs.get('snapshot_version', id(df))
         for column in df.columns:
-            col_key = f"filter_{column}_{id(df)}"  # Make key unique using column name and dataframe id
+            col_key = f"filter_{column}_{frame_key}"  # Make key unique using column name and dataframe
+            stats = profile[column]
 
-            if pd.api.types.is_datetime64_any_dtype(df[column]):
+            if stats['kind'] == 'datetime':
                 # Special handling for date columns
-                min_date = pd.to_datetime(df[column].min())
-                max_date = pd.to_datetime(df[column].max())
+                min_date = pd.to_datetime(stats['min'])
+                max_date = pd.to_datetime(stats['max'])
                 default_dates = saved_filters.get(column, (min_date, max_date))
                 filters[column] = st.date_input(
                     f"Filter {column}",
                     value=default_dates,
                     key=f"{col_key}_date"
                 )
-            elif pd.api.types.is_numeric_dtype(df[column]):
+            elif stats['kind'] == 'numeric':
                 # Handle numeric range filters
                 try:
-                    min_val = float(df[column].min())
-                    max_val = float(df[column].max())
+                    min_val = float(stats['min'])
+                    max_val = float(stats['max'])
                     default_range = saved_filters.get(column, (min_val, max_val))
                     filters[column] = st.slider(
                         f"Filter {column}",
@@ -41,8 +48,8 @@ def render_filters(df, page_context=''):
                     pass
             else:
                 # Handle text columns
-                unique_values = df[column].unique()
-                if len(unique_values) < 10:  # Use select box for columns with few unique values
+                unique_values = stats['values']
+                if unique_values is not None:  # Use select box for columns with few unique values
                     default_selection = saved_filters.get(column, [])
                     filters[column] = st.multiselect(
                         f"Filter {column}",
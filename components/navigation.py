@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.auth import logout_user
+from components.debug_panel import render_debug_panel
 
 def render_navigation(current_page=None):
     """Render navigation buttons."""
@@ -43,6 +44,9 @@ def render_navigation(current_page=None):
     # Add a separator below navigation
     st.markdown("---")
 
+    # Optional stage timings for diagnosing slow pages
+    render_debug_panel()
+
     # Add logout button in the sidebar
     st.sidebar.markdown("---")
     if st.sidebar.button("🚪 Logout"):
@@ -1,11 +1,26 @@
 import streamlit as st
-from utils.gsheets import load_sheet_data
-from utils.data_operations import filter_dataframe, sort_dataframe, select_columns
-from utils.settings_manager import load_settings, save_settings
+from utils.sheet_refresher import start_sheet_refresher
+from components.debug_panel import start_metrics_export
+from utils.auth import is_logged_in
+
+# Keep sheet data warm in the background (starts once per server process)
+start_sheet_refresher()
+start_metrics_export()
+
+# Check authentication first
+if not is_logged_in():
+    st.error("Please log in to access this page")
+    st.stop()
+
+# Logged out visitors stop above without loading pandas or the Google clients
+from utils.gsheets import build_range_name, load_sheet_data, clear_sheet_cache
+from utils.data_operations import build_view
+from utils.view_cache import VIEW_CACHE
+from utils.metrics import timed
+from utils.settings_manager import load_settings, save_settings, queue_settings_save
 from components.data_table import render_data_table, column_selector
 from components.filters import render_filters, render_sort_controls
 from components.navigation import render_navigation
-from utils.auth import is_logged_in
 import pandas as pd
 
 # Initialize session state for persistent settings
@@ -30,8 +45,9 @@ if 'alerts_settings' not in st.session_state:
 def process_datetime_columns(df):
     """Split datetime column into date and time columns while keeping original."""
     if 'Date' in df.columns:
-        # Convert to datetime
-        df['Date'] = pd.to_datetime(df['Date'])
+        # The sheet schema normally delivers Date already parsed
+        if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+            df['Date'] = pd.to_datetime(df['Date'])
         # Create new date and time columns
         df['Date_Only'] = df['Date'].dt.strftime('%Y-%m-%d')
         df['Time'] = df['Date'].dt.strftime('%H:%M:%S')
@@ -50,12 +66,12 @@ def save_current_settings():
             'start_col': st.session_state.start_col,
             'end_col': st.session_state.end_col,
             'start_row': st.session_state.start_row,
-            'end_row': st.session_state.end_row,
+            'end_row': st.session_state.alerts_settings.get('end_row', 1000),
             'sort_by': st.session_state.get('sort_by', ""),
             'sort_ascending': st.session_state.get('sort_ascending', True),
             'selected_columns': st.session_state.get('column_selector', []),
             'filters': st.session_state.get('current_filters', {}),
-            'max_rows': st.session_state.get('max_rows', 200)
+            'max_rows': st.session_state.alerts_settings.get('max_rows', 200)
         }
 
         if save_settings(current_settings, 'alerts'):
@@ -69,11 +85,6 @@ def save_current_settings():
         return False
 
 def display_alerts_page():
-    # Check authentication first
-    if not is_logged_in():
-        st.error("Please log in to access this page")
-        st.stop()
-
     # Add navigation at the top
     render_navigation('alerts')
 
@@ -87,7 +98,7 @@ def display_alerts_page():
         st.title("Market Alerts")
     with col2:
         if st.button("🔄 Refresh Data", key="refresh_alerts"):
-            st.cache_data.clear()
+            clear_sheet_cache()
             st.success("Data cache cleared! Loading fresh data...")
     with col3:
         if st.button("💾 Save Settings", key="save_settings_alerts"):
@@ -134,26 +145,22 @@ def display_alerts_page():
         key="start_row",
         help="Enter start row number"
     )
-    end_row = st.sidebar.number_input(
-        "End Row",
-        min_value=start_row,
-        value=st.session_state.alerts_settings['end_row'],
-        key="end_row",
-        help="Enter end row number"
-    )
+    st.sidebar.caption("Alerts are read to the last row of the sheet, including new ones.")
 
-    # Create range with proper format
-    range_name = f"'{sheet_name}'!{start_col}{start_row}:{end_col}{end_row}"
+    # Open-ended range, so appended alerts are picked up by the tail fetch
+    range_name = build_range_name(sheet_name, start_col, start_row, end_col)
 
     # Load data
     if spreadsheet_id and sheet_name:
         with st.spinner("Loading data..."):
             try:
-                df = load_sheet_data(spreadsheet_id, range_name)
+                # The ALERTS sheet is append-only, so only new rows are fetched
+                df = load_sheet_data(spreadsheet_id, range_name, incremental=True)
 
                 if df is not None and not df.empty:
                     # Process datetime columns
-                    df = process_datetime_columns(df)
+                    with timed('process_datetime_columns', rows=len(df)):
+                        df = process_datetime_columns(df)
 
                     # Convert all column names to string type for consistent filtering
                     df.columns = df.columns.astype(str)
@@ -175,24 +182,27 @@ def display_alerts_page():
                     sort_by = st.session_state.get('sort_by', 'Date')  # Default to 'Date'
                     ascending = st.session_state.get('sort_ascending', False)  # Default to descending
 
-                    # Apply filtering
-                    filtered_df = filter_dataframe(df, filters)
-
-                    # Apply sorting if a sort column is set
-                    if sort_by:
-                        filtered_df = sort_dataframe(filtered_df, sort_by, ascending)
+                    # Apply filtering, sorting and column selection (cached per snapshot)
+                    filtered_df = build_view(df, filters, sort_by, ascending, selected_columns)
 
                     # Display data
                     st.subheader("Data View")
-                    render_data_table(filtered_df, selected_columns)
+                    render_data_table(
+                        filtered_df,
+                        None,
+                        max_rows=st.session_state.alerts_settings.get('max_rows'),
+                        key="alerts_table"
+                    )
 
                     # Display data info
                     st.sidebar.markdown("---")
                     st.sidebar.subheader("Data Info")
+                    view_stats = VIEW_CACHE.stats()
                     st.sidebar.info(f"""
                         - Total Rows: {len(df)}
                         - Total Columns: {len(df.columns)}
                         - Filtered Rows: {len(filtered_df)}
+                        - View Cache: {view_stats['hits']} hits / {view_stats['misses']} misses ({view_stats['hit_rate']:.0%})
                         - Range: {range_name}
                     """)
                 else:
@@ -203,14 +213,14 @@ def display_alerts_page():
     else:
         st.info("Please enter a Spreadsheet ID and sheet name to begin.")
 
-    # Update sort settings when they change
+    # Persist sort settings in the background when they change
     if 'sort_by' in st.session_state or 'sort_ascending' in st.session_state:
         current_settings = st.session_state.alerts_settings.copy()
         current_settings.update({
             'sort_by': st.session_state.get('sort_by', "Date"),
             'sort_ascending': st.session_state.get('sort_ascending', False)
         })
-        save_settings(current_settings, 'alerts')
+        queue_settings_save(current_settings, 'alerts')
 
 if __name__ == "__main__":
     display_alerts_page()
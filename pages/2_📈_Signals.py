@@ -1,18 +1,31 @@
 import streamlit as st
-from utils.gsheets import load_sheet_data
-from utils.data_operations import filter_dataframe, sort_dataframe, select_columns
-from utils.settings_manager import load_settings, save_settings
-from utils.database import import_market_symbols_from_file, load_market_symbols
-from components.data_table import render_data_table, column_selector
-from components.filters import render_filters, render_sort_controls
-from components.navigation import render_navigation
+from utils.sheet_refresher import start_sheet_refresher
+from components.debug_panel import start_metrics_export
 from utils.auth import is_logged_in
 
+# Keep sheet data warm in the background (starts once per server process)
+start_sheet_refresher()
+start_metrics_export()
+
 # Check authentication first
 if not is_logged_in():
     st.error("Please log in to access this page")
     st.stop()
 
+# Logged out visitors stop above without loading pandas or the Google clients
+from utils.gsheets import load_sheet_data, clear_sheet_cache
+from utils.data_operations import build_view
+from utils.view_cache import VIEW_CACHE
+from utils.settings_manager import load_settings, save_settings
+from utils.database import import_market_symbols_from_file
+from utils.symbol_registry import enrich_with_symbols, get_symbol_registry
+from components.data_table import render_data_table, column_selector
+from components.filters import render_filters, render_sort_controls
+from components.navigation import render_navigation
+
+# Symbol list imported when no file is uploaded
+DEFAULT_SYMBOLS_FILE = "attached_assets/Pasted-0LNB-SG-XBT-Bitcoin-Tracker-Euro-AGAP-L-WisdomTree-Agriculture-AGCP-L-WisdomTree-Broad-Commodities-A-1739880998797.txt"
+
 # Initialize session state for persistent settings
 if 'signals_settings' not in st.session_state:
     st.session_state.signals_settings = load_settings('signals')
@@ -44,7 +57,8 @@ def save_current_settings():
             'sort_by': st.session_state.get('sort_by', "TPI Slope"),
             'sort_ascending': st.session_state.get('sort_ascending', False),
             'selected_columns': st.session_state.get('column_selector', []),
-            'filters': st.session_state.get('current_filters', {})
+            'filters': st.session_state.get('current_filters', {}),
+            'max_rows': st.session_state.signals_settings.get('max_rows', 200)
         }
 
         st.session_state.signals_settings = current_settings
@@ -93,7 +107,7 @@ def display_signals_page():
             st.title("Market Signals")
         with col2:
             if st.button("🔄 Refresh Data", key="refresh_signals"):
-                st.cache_data.clear()
+                clear_sheet_cache()
                 st.success("Data cache cleared! Loading fresh data...")
         with col3:
             if st.button("💾 Save Settings", key="save_settings_signals"):
@@ -101,14 +115,14 @@ def display_signals_page():
 
         st.markdown("---")
 
-        # Import market symbols if available
+        # Market symbols are loaded once per process and shared between sessions
         try:
-            market_symbols_df = load_market_symbols()
-            if not market_symbols_df.empty:
-                st.success(f"Loaded {len(market_symbols_df)} market symbols from database")
+            symbol_registry = get_symbol_registry()
+            if len(symbol_registry):
+                st.success(f"Loaded {len(symbol_registry)} market symbols from database")
         except Exception as e:
             st.warning(f"Could not load market symbols: {str(e)}")
-            market_symbols_df = None
+            symbol_registry = None
 
         # Sidebar for sheet configuration
         st.sidebar.header("Sheet Configuration")
@@ -162,18 +176,40 @@ def display_signals_page():
         if not range_name:
             return
 
-        # Import market symbols button
+        # Import market symbols from an uploaded file, or the bundled list
+        st.sidebar.subheader("Market Symbols")
+        symbols_file = st.sidebar.file_uploader(
+            "Symbols File",
+            type=['txt', 'tsv'],
+            key="symbols_file",
+            help="One symbol per line: SYMBOL<tab>Description"
+        )
         if st.sidebar.button("📥 Import Market Symbols"):
             try:
-                import_market_symbols_from_file(
-                    "attached_assets/Pasted-0LNB-SG-XBT-Bitcoin-Tracker-Euro-AGAP-L-WisdomTree-Agriculture-AGCP-L-WisdomTree-Broad-Commodities-A-1739880998797.txt"
+                counts = import_market_symbols_from_file(symbols_file or DEFAULT_SYMBOLS_FILE)
+                st.success(
+                    f"Market symbols imported: {counts['inserted']} new, "
+                    f"{counts['updated']} updated, {counts['unchanged']} unchanged"
                 )
-                st.success("Market symbols imported successfully!")
-                # Refresh the market symbols display
-                market_symbols_df = load_market_symbols()
+                # Pick up the imported symbols
+                symbol_registry = get_symbol_registry()
             except Exception as e:
                 st.error(f"Error importing market symbols: {str(e)}")
 
+        # Symbol lookup by ticker prefix, with suggestions for near misses
+        if symbol_registry is not None:
+            symbol_query = st.sidebar.text_input(
+                "Symbol Lookup",
+                key="symbol_lookup",
+                help="Type the start of a ticker"
+            )
+            if symbol_query:
+                matches = symbol_registry.prefix_search(symbol_query) or symbol_registry.fuzzy_search(symbol_query)
+                if matches:
+                    st.sidebar.markdown("\n".join(f"- **{symbol}**: {description}" for symbol, description in matches))
+                else:
+                    st.sidebar.caption("No matching symbols")
+
         # Validate inputs and create range
         is_valid, error_message = validate_range_inputs(sheet_name, start_col, end_col, start_row, end_row)
         if not is_valid:
@@ -187,6 +223,10 @@ def display_signals_page():
                 try:
                     df = load_sheet_data(spreadsheet_id, range_name)
 
+                    # Attach instrument descriptions from the symbol registry
+                    if df is not None and symbol_registry is not None:
+                        df = enrich_with_symbols(df, symbol_registry)
+
                     if df is not None and not df.empty:
                         st.success("Data loaded successfully!")
 
@@ -207,22 +247,27 @@ def display_signals_page():
                             page_context='signals'
                         )
 
-                        # Apply operations
-                        filtered_df = filter_dataframe(df, filters)
-                        if sort_by:
-                            filtered_df = sort_dataframe(filtered_df, sort_by, ascending)
+                        # Apply filtering, sorting and column selection (cached per snapshot)
+                        filtered_df = build_view(df, filters, sort_by, ascending, selected_columns)
 
                         # Display data
                         st.subheader("Data View")
-                        render_data_table(filtered_df, selected_columns)
+                        render_data_table(
+                            filtered_df,
+                            None,
+                            max_rows=st.session_state.signals_settings.get('max_rows'),
+                            key="signals_table"
+                        )
 
                         # Display data info
                         st.sidebar.markdown("---")
                         st.sidebar.subheader("Data Info")
+                        view_stats = VIEW_CACHE.stats()
                         st.sidebar.info(f"""
                             - Total Rows: {len(df)}
                             - Total Columns: {len(df.columns)}
                             - Filtered Rows: {len(filtered_df)}
+                            - View Cache: {view_stats['hits']} hits / {view_stats['misses']} misses ({view_stats['hit_rate']:.0%})
                             - Range: {range_name}
                         """)
                     else:
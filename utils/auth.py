@@ -1,178 +1,267 @@
-import hashlib
-import os  # Added to load environment variables
 import streamlit as st
 from typing import Optional, Tuple
 
 import secrets
 from datetime import datetime, timedelta
-from twilio.rest import Client
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from utils.database import db_connection
+from utils.passwords import check_password, compute_password_hash, needs_rehash, run_in_pool
+from utils.sessions import create_session_token, verify_session_token
 
-
-
-# Access DATABASE_URL environment variable from Streamlit Cloud secrets
-DATABASE_URL = os.getenv('DATABASE_URL')  # This retrieves the DATABASE_URL set in Streamlit Cloud Secrets
-
-def get_db_connection():
-    """Create a database connection using environment variables."""
-    try:
-        # Using the DATABASE_URL from the environment variable (Streamlit Cloud secrets)
-        conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-        return conn
-    except Exception as e:
-        raise Exception(f"Database connection error: {str(e)}")
-
-# The rest of your app.py continues without changes below
 def hash_password(password: str) -> str:
-    """Hash a password with salt."""
-    salt = os.urandom(32)
-    key = hashlib.pbkdf2_hmac(
-        'sha256',
-        password.encode('utf-8'),
-        salt,
-        100000
-    )
-    return salt.hex() + ':' + key.hex()
+    """Hash a password with salt, off the script thread."""
+    return run_in_pool(compute_password_hash, password)
 
 def verify_password(stored_password: str, provided_password: str) -> bool:
-    """Verify a stored password against a provided password."""
-    salt_str, key_str = stored_password.split(':')
-    salt = bytes.fromhex(salt_str)
-    stored_key = bytes.fromhex(key_str)
-    new_key = hashlib.pbkdf2_hmac(
-        'sha256',
-        provided_password.encode('utf-8'),
-        salt,
-        100000
-    )
-    return stored_key == new_key
+    """Verify a stored password against a provided password, off the script thread."""
+    return run_in_pool(check_password, stored_password, provided_password)
 
 def create_user(username: str, password: str, email: str) -> bool:
     """Create a new user in the database."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        hashed_password = hash_password(password)
-        cursor.execute("""
-            INSERT INTO users (username, password_hash, email)
-            VALUES (%s, %s, %s)
-            RETURNING id
-        """, (username, hashed_password, email))
-        conn.commit()
-        return True
-    except Exception as e:
-        st.error(f"Error creating user: {str(e)}")
-        return False
-    finally:
-        conn.close()
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            hashed_password = hash_password(password)
+            cursor.execute("""
+                INSERT INTO users (username, password_hash, email)
+                VALUES (%s, %s, %s)
+                RETURNING id
+            """, (username, hashed_password, email))
+            conn.commit()
+            return True
+        except Exception as e:
+            st.error(f"Error creating user: {str(e)}")
+            return False
 
 def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[int]]:
     """Authenticate a user and return (success, user_id)."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, password_hash
-            FROM users
-            WHERE username = %s
-        """, (username,))
-        result = cursor.fetchone()
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, password_hash
+                FROM users
+                WHERE username = %s
+            """, (username,))
+            result = cursor.fetchone()
+
+            if not result or not verify_password(result['password_hash'], password):
+                return False, None
 
-        if result and verify_password(result['password_hash'], password):
+            # Move old hashes to the current format and work factor
+            if needs_rehash(result['password_hash']):
+                cursor.execute("""
+                    UPDATE users
+                    SET password_hash = %s
+                    WHERE id = %s
+                """, (hash_password(password), result['id']))
+                conn.commit()
             return True, result['id']
-        return False, None
-    except Exception as e:
-        st.error(f"Authentication error: {str(e)}")
-        return False, None
-    finally:
-        conn.close()
+        except Exception as e:
+            st.error(f"Authentication error: {str(e)}")
+            return False, None
 
 def create_password_reset_token(email: str) -> Optional[str]:
     """Create a password reset token for a user."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
+            user = cursor.fetchone()
 
-        if not user:
-            return None
+            if not user:
+                return None
 
-        token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(hours=24)
+            token = secrets.token_urlsafe(32)
+            expires_at = datetime.now() + timedelta(hours=24)
 
-        cursor.execute("""
-            INSERT INTO password_reset_tokens 
-            (user_id, token, expires_at)
-            VALUES (%s, %s, %s)
-        """, (user['id'], token, expires_at))
+            cursor.execute("""
+                INSERT INTO password_reset_tokens 
+                (user_id, token, expires_at)
+                VALUES (%s, %s, %s)
+            """, (user['id'], token, expires_at))
 
-        conn.commit()
-        return token
-    except Exception as e:
-        st.error(f"Error creating reset token: {str(e)}")
-        return None
-    finally:
-        conn.close()
+            conn.commit()
+            return token
+        except Exception as e:
+            st.error(f"Error creating reset token: {str(e)}")
+            return None
+
+def find_reset_token_user(cursor, token: str) -> Optional[int]:
+    """Look up the user of an unused, unexpired reset token with an open cursor."""
+    cursor.execute("""
+        SELECT user_id
+        FROM password_reset_tokens
+        WHERE token = %s 
+        AND used = FALSE
+        AND expires_at > CURRENT_TIMESTAMP
+    """, (token,))
+    result = cursor.fetchone()
+    return result['user_id'] if result else None
 
 def verify_reset_token(token: str) -> Optional[int]:
     """Verify a password reset token and return user_id if valid."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT user_id
-            FROM password_reset_tokens
-            WHERE token = %s 
-            AND used = FALSE
-            AND expires_at > CURRENT_TIMESTAMP
-        """, (token,))
-        result = cursor.fetchone()
-        return result['user_id'] if result else None
-    except Exception as e:
-        st.error(f"Error verifying token: {str(e)}")
-        return None
-    finally:
-        conn.close()
+    with db_connection() as conn:
+        try:
+            return find_reset_token_user(conn.cursor(), token)
+        except Exception as e:
+            st.error(f"Error verifying token: {str(e)}")
+            return None
 
 def reset_password(token: str, new_password: str) -> bool:
     """Reset a user's password using a valid token."""
-    conn = get_db_connection()
     try:
-        user_id = verify_reset_token(token)
-        if not user_id:
+        create_session_table()
+    except Exception as e:
+        st.error(f"Error resetting password: {str(e)}")
+        return False
+
+    with db_connection() as conn:
+        try:
+            # Check the token on the same connection as the update
+            cursor = conn.cursor()
+            user_id = find_reset_token_user(cursor, token)
+            if not user_id:
+                return False
+
+            hashed_password = hash_password(new_password)
+            cursor.execute("""
+                UPDATE users 
+                SET password_hash = %s 
+                WHERE id = %s
+            """, (hashed_password, user_id))
+
+            cursor.execute("""
+                UPDATE password_reset_tokens 
+                SET used = TRUE 
+                WHERE token = %s
+            """, (token,))
+
+            # Log out every existing session of the user
+            bump_session_generation(conn, user_id)
+
+            conn.commit()
+            return True
+        except Exception as e:
+            st.error(f"Error resetting password: {str(e)}")
             return False
 
+@st.cache_resource(show_spinner=False)
+def create_session_table():
+    """Create the table of per-user session generations once per server process.
+
+    Runs in its own transaction before the first use of the table. A failure
+    is not cached, so the next call tries again.
+    """
+    with db_connection() as conn:
         cursor = conn.cursor()
-        hashed_password = hash_password(new_password)
         cursor.execute("""
-            UPDATE users 
-            SET password_hash = %s 
-            WHERE id = %s
-        """, (hashed_password, user_id))
+            CREATE TABLE IF NOT EXISTS user_sessions (
+                user_id INTEGER PRIMARY KEY,
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.commit()
 
-        cursor.execute("""
-            UPDATE password_reset_tokens 
-            SET used = TRUE 
-            WHERE token = %s
-        """, (token,))
+def get_session_generation(user_id: int) -> Optional[int]:
+    """Return the user's current session generation, or None if it cannot be read."""
+    try:
+        create_session_table()
+    except Exception as e:
+        st.error(f"Error checking session: {str(e)}")
+        return None
 
-        conn.commit()
-        return True
+    with db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT generation FROM user_sessions WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
+            return result['generation'] if result else 0
+        except Exception as e:
+            st.error(f"Error checking session: {str(e)}")
+            return None
+
+def bump_session_generation(conn, user_id: int):
+    """Revoke all of a user's session tokens; the caller commits.
+
+    create_session_table() must have run first.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO user_sessions (user_id, generation)
+        VALUES (%s, 1)
+        ON CONFLICT (user_id)
+        DO UPDATE SET generation = user_sessions.generation + 1
+    """, (user_id,))
+
+def revoke_sessions(user_id: int):
+    """Revoke all of a user's session tokens, on every server."""
+    try:
+        create_session_table()
     except Exception as e:
-        st.error(f"Error resetting password: {str(e)}")
+        st.error(f"Error ending session: {str(e)}")
+        return
+
+    with db_connection() as conn:
+        try:
+            bump_session_generation(conn, user_id)
+            conn.commit()
+        except Exception as e:
+            st.error(f"Error ending session: {str(e)}")
+
+def start_session(user_id: int, username: str):
+    """Log a user in for this browser session and issue a signed session token.
+
+    The token is put in the `session` query parameter so a refresh or
+    reconnect soon after logging in can restore the login without a password
+    check. It is removed from the URL once restored.
+    """
+    token = create_session_token(user_id, username, get_session_generation(user_id) or 0)
+    st.session_state.user_id = user_id
+    st.session_state.username = username
+    st.session_state.session_token = token
+    st.query_params['session'] = token
+
+def restore_session() -> bool:
+    """Restore the login from the session token in the URL, if it is valid.
+
+    The signature and expiry are checked locally; one query checks that the
+    token has not been revoked by a logout or password reset since.
+    """
+    token = st.query_params.get('session')
+    claims = verify_session_token(token)
+    if claims and claims.get('gen') != get_session_generation(claims['uid']):
+        claims = None
+    if not claims:
+        if token:
+            del st.query_params['session']
         return False
-    finally:
-        conn.close()
+
+    st.session_state.user_id = claims['uid']
+    st.session_state.username = claims['usr']
+    st.session_state.session_token = token
+    st.session_state.auth_state = 'logged_in'
+    # The login now lives in session_state; keep the bearer token out of the URL
+    del st.query_params['session']
+    # Unset rather than False, so any page loads the user's settings
+    st.session_state.pop('settings_initialized', None)
+    return True
 
 def is_logged_in() -> bool:
-    """Check if a user is currently logged in."""
-    return bool(st.session_state.get('user_id')) and bool(st.session_state.get('username'))
+    """Check if a user is currently logged in, restoring a signed session if needed."""
+    if st.session_state.get('user_id') and st.session_state.get('username'):
+        return True
+    return restore_session()
 
 def logout_user():
     """Log out the current user."""
+    # Revoke the user's session tokens so the URL cannot log back in
+    claims = verify_session_token(st.session_state.get('session_token') or st.query_params.get('session'))
+    if claims:
+        revoke_sessions(claims['uid'])
+    if 'session' in st.query_params:
+        del st.query_params['session']
+
     # Clear all session state
     for key in list(st.session_state.keys()):
         del st.session_state[key]
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from utils.snapshot_cache import get_snapshot_artifact
+
+# Columns with fewer distinct values than this keep their value list
+MAX_LISTED_VALUES = 10
+
+def column_kind(series):
+    """Classify a column as 'datetime', 'numeric' or 'text'."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    return 'text'
+
+def column_statistics(series):
+    """Compute the statistics the filter widgets need for one column.
+
+    Returns a dict with kind, min, max (datetime/numeric only), null_count,
+    distinct (non-null distinct count) and values: the distinct values,
+    including missing ones, when there are fewer than MAX_LISTED_VALUES.
+    """
+    kind = column_kind(series)
+    null_count = int(series.isna().sum())
+    stats = {
+        'kind': kind,
+        'min': None,
+        'max': None,
+        'null_count': null_count,
+        'distinct': int(series.nunique()),
+        'values': None
+    }
+
+    if kind in ('datetime', 'numeric'):
+        stats['min'] = series.min()
+        stats['max'] = series.max()
+    elif stats['distinct'] + (1 if null_count else 0) < MAX_LISTED_VALUES:
+        stats['values'] = list(series.unique())
+
+    return stats
+
+def build_column_profile(df):
+    """Compute the statistics of every column of a frame."""
+    return {column: column_statistics(df[column]) for column in df.columns}
+
+def get_column_profile(df):
+    """Return the column profile of a frame, computed once per snapshot version."""
+    profile = get_snapshot_artifact(df, ('column_profile', tuple(df.columns)), build_column_profile)
+    if profile is None:
+        profile = build_column_profile(df)
+    return profile
@@ -0,0 +1,86 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+# Compaction of parsed sheet frames can be switched off with COMPACT_SHEET_FRAMES=0
+COMPACT_FRAMES = os.getenv('COMPACT_SHEET_FRAMES', '1') == '1'
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+# Candidate integer dtypes, smallest first: (numpy dtype, nullable pandas dtype)
+INT_DTYPES = (('int8', 'Int8'), ('int16', 'Int16'), ('int32', 'Int32'))
+
+logger = logging.getLogger(__name__)
+
+def smallest_int_dtype(series):
+    """Return the smallest integer dtype that holds every value, or None.
+
+    A nullable dtype is returned when the column has missing values.
+    """
+    values = series.dropna()
+    if values.empty or not (values % 1 == 0).all():
+        return None
+
+    low, high = values.min(), values.max()
+    for numpy_dtype, nullable_dtype in INT_DTYPES:
+        bounds = np.iinfo(numpy_dtype)
+        if bounds.min <= low and high <= bounds.max:
+            return nullable_dtype if series.isna().any() else numpy_dtype
+    return None
+
+def compact_column(series, kind=None):
+    """Return a smaller representation of a column, or the column itself."""
+    if pd.api.types.is_bool_dtype(series):
+        return series
+
+    if pd.api.types.is_numeric_dtype(series):
+        int_dtype = smallest_int_dtype(series)
+        # Quad regimes (1-4) are stored as small ints even when some are blank
+        if int_dtype and (int_dtype.islower() or str(series.name).startswith('Quad for')):
+            return series.astype(int_dtype)
+
+        if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            as_float32 = series.astype(np.float32)
+            if (as_float32.astype(series.dtype).eq(series) | series.isna()).all():
+                return as_float32
+        return series
+
+    if series.dtype == object:
+        present = series.notna().sum()
+        if kind == 'categorical' or (present and series.nunique() <= present * CATEGORY_MAX_RATIO):
+            return series.astype('category')
+
+    return series
+
+def compact_dataframe(df, schema=None):
+    """Shrink a parsed frame: categorical text, downcast numerics, small-int Quads.
+
+    Returns (DataFrame, bytes_saved). The frame is returned unchanged when
+    compaction is disabled.
+    """
+    if not COMPACT_FRAMES or df.columns.empty:
+        return df, 0
+
+    schema = schema or {}
+    bytes_before = int(df.memory_usage(deep=True).sum())
+
+    compacted = pd.concat(
+        [
+            compact_column(df.iloc[:, position], schema.get(col))
+            for position, col in enumerate(df.columns)
+        ],
+        axis=1
+    )
+    compacted.columns = df.columns
+    compacted.attrs = dict(df.attrs)
+
+    bytes_saved = bytes_before - int(compacted.memory_usage(deep=True).sum())
+    compacted.attrs['bytes_saved'] = bytes_saved
+    logger.info(
+        "Compacted frame with %d rows: %d bytes saved of %d",
+        len(df), bytes_saved, bytes_before
+    )
+    return compacted, bytes_saved
@@ -1,60 +1,179 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
+from utils.column_stats import get_column_profile
+from utils.metrics import timed
+from utils.search_index import get_search_index
+from utils.sort_order import get_sort_order, sort_columns, sort_directions, stable_sort_positions
+from utils.view_cache import VIEW_CACHE, normalize_filters
 
-def filter_dataframe(df, filters):
-    """Apply filters to DataFrame."""
-    if df is None or filters is None:
-        return df
+def text_contains_mask(series, text):
+    """Case-insensitive substring mask for a column, as a NumPy array."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Match each category once and map the result back through the codes
+        categories = pd.Series(series.cat.categories.astype(str))
+        matches = categories.str.contains(text, case=False, regex=False).to_numpy()
+        return np.append(matches, False)[series.cat.codes.to_numpy()]
+
+    return series.astype(str).str.contains(text, case=False, regex=False).to_numpy()
+
+def column_filter_mask(df, column, filter_value, stats=None):
+    """Build the row mask for one column filter.
+
+    Returns None when the filter has no effect, e.g. an empty selection or
+    a range covering every value in the column. `stats` are the column's
+    precomputed statistics; without them min/max are computed here.
+    """
+    if not filter_value:
+        return None
+
+    series = df[column]
+    if stats is None and (
+        pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_numeric_dtype(series)
+    ):
+        stats = {'min': series.min(), 'max': series.max()}
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Handle date range filters
+        try:
+            start_date, end_date = filter_value
+            start = pd.Timestamp(start_date)
+            end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        except (TypeError, ValueError):
+            return None
+        if start <= stats['min'] and stats['max'] < end:
+            return None
+        return ((series >= start) & (series < end)).to_numpy()
+
+    if pd.api.types.is_numeric_dtype(series):
+        # Handle numeric range filters
+        try:
+            min_val, max_val = filter_value
+            if min_val <= stats['min'] and max_val >= stats['max']:
+                return None
+        except (TypeError, ValueError):
+            return None
+        # Nullable integer columns yield <NA> for missing values
+        in_range = (series >= min_val) & (series <= max_val)
+        return in_range.to_numpy(dtype=bool, na_value=False)
+
+    if isinstance(filter_value, list):
+        # Handle multiselect filters
+        if filter_value[0] == "":  # No values selected
+            return None
+        return series.isin(filter_value).to_numpy()
+
+    # Handle text search filters
+    if not str(filter_value).strip():
+        return None
+
+    # Snapshots answer substring queries from their trigram index
+    search_index = get_search_index(df, column)
+    if search_index is not None:
+        return search_index.contains_mask(str(filter_value))
+    return text_contains_mask(series, str(filter_value))
+
+def filter_mask(df, filters):
+    """Combine all active filters into a single boolean row mask.
+
+    Returns None when no filter is active. Filters on missing columns are ignored.
+    """
+    if df is None or not filters:
+        return None
 
-    filtered_df = df.copy()
+    # Snapshots reuse their cached column statistics for the min/max checks
+    profile = get_column_profile(df) if df.attrs.get('snapshot_version') else {}
 
+    mask = None
     for column, filter_value in filters.items():
-        if filter_value:  # Only apply non-empty filters
-            if pd.api.types.is_datetime64_any_dtype(df[column]):
-                # Handle date range filters
-                try:
-                    start_date, end_date = filter_value
-                    filtered_df = filtered_df[
-                        (filtered_df[column].dt.date >= start_date) & 
-                        (filtered_df[column].dt.date <= end_date)
-                    ]
-                except:
-                    pass
-            elif pd.api.types.is_numeric_dtype(df[column]):
-                # Handle numeric range filters
-                try:
-                    min_val, max_val = filter_value
-                    filtered_df = filtered_df[
-                        (filtered_df[column] >= min_val) & 
-                        (filtered_df[column] <= max_val)
-                    ]
-                except:
-                    pass
-            elif isinstance(filter_value, list):
-                # Handle multiselect filters
-                if filter_value and filter_value[0] != "":  # Check if any non-empty values selected
-                    filtered_df = filtered_df[filtered_df[column].isin(filter_value)]
-            else:
-                # Handle text search filters
-                if str(filter_value).strip():  # Only apply non-empty text filters
-                    filtered_df = filtered_df[filtered_df[column].astype(str).str.contains(
-                        str(filter_value), 
-                        case=False, 
-                        na=False
-                    )]
-
-    return filtered_df
-
-def sort_dataframe(df, sort_by, ascending=True):
-    """Sort DataFrame by column."""
+        if column not in df.columns:
+            continue
+        column_mask = column_filter_mask(df, column, filter_value, profile.get(column))
+        if column_mask is not None:
+            mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+def take_rows(df, positions):
+    """Gather rows by position into a derived frame.
+
+    The derived frame no longer lines up with its snapshot's row positions,
+    so it drops the snapshot version that keys per-snapshot artifacts.
+    """
+    view = df.take(positions)
+    view.attrs.pop('snapshot_version', None)
+    return view
+
+def filter_dataframe(df, filters):
+    """Apply filters to DataFrame.
+
+    All active filters are combined into a single row mask, which is
+    applied with one final take. Filters on missing columns are ignored.
+    """
+    with timed('filter', rows=len(df) if df is not None else 0):
+        mask = filter_mask(df, filters)
+        if mask is None:
+            return df
+        return take_rows(df, np.flatnonzero(mask))
+
+def sort_dataframe(df, sort_by, ascending=True, na_position='last'):
+    """Sort DataFrame by one or more columns (stable).
+
+    Snapshots reuse their cached sort permutation.
+    """
     if df is None or not sort_by:
         return df
 
-    return df.sort_values(by=sort_by, ascending=ascending)
+    with timed('sort', rows=len(df)):
+        order = get_sort_order(df, sort_by, ascending, na_position)
+        if order is None:
+            order = stable_sort_positions(df, sort_by, ascending, na_position)
+        return take_rows(df, order)
 
 def select_columns(df, selected_columns):
     """Select specific columns from DataFrame."""
     if df is None or not selected_columns:
         return df
 
-    return df[selected_columns]
\ No newline at end of file
+    return df[selected_columns]
+
+def build_view(df, filters, sort_by=None, ascending=True, selected_columns=None, na_position='last'):
+    """Filter, sort and select columns of a frame.
+
+    Views of snapshot frames are cached in the process-wide VIEW_CACHE, keyed
+    by snapshot version, filters, sort and selected columns, so repeated or
+    toggled-back views are served without recomputation. On a miss, the
+    filter mask is gathered along the snapshot's cached sort permutation,
+    so re-sorting is a linear pass instead of a full sort. Returned views
+    are shared and must not be modified.
+    """
+    if df is None:
+        return df
+
+    columns = sort_columns(sort_by)
+    key = None
+    version = df.attrs.get('snapshot_version')
+    if version:
+        key = (
+            version, len(df), tuple(df.columns), normalize_filters(filters),
+            columns, sort_directions(ascending, columns), na_position,
+            tuple(selected_columns or ())
+        )
+        cached_view = VIEW_CACHE.get(key)
+        if cached_view is not None:
+            return cached_view
+
+    with timed('view_build', rows=len(df)):
+        with timed('filter', rows=len(df)):
+            mask = filter_mask(df, filters)
+        order = get_sort_order(df, columns, ascending, na_position) if columns else None
+        if order is not None:
+            with timed('sort', rows=len(df)):
+                view = take_rows(df, order if mask is None else order[mask[order]])
+        else:
+            view = df if mask is None else take_rows(df, np.flatnonzero(mask))
+            view = sort_dataframe(view, columns, ascending, na_position)
+        view = select_columns(view, selected_columns)
+
+    if key and view is not df:
+        VIEW_CACHE.put(key, view)
+    return view
@@ -1,7 +1,31 @@
+import csv
+import io
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from psycopg2.extras import RealDictCursor
-import pandas as pd
+
+from utils.metrics import register_metric_source
+
+# Connection pool limits
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))  # Close connections idle this long
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '30'))  # Wait this long for a free connection
+DB_POOL_CHECK_AFTER = float(os.getenv('DB_POOL_CHECK_AFTER', '30'))  # Ping connections idle this long before reuse
+
+# Symbol file lines sent per COPY chunk during imports
+SYMBOL_IMPORT_CHUNK_SIZE = int(os.getenv('SYMBOL_IMPORT_CHUNK_SIZE', '50000'))
+
+# Bumped after every symbol import so in-memory symbol caches reload
+SYMBOLS_VERSION = 0
+SYMBOLS_VERSION_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
 
 def get_db_connection():
     """Create a database connection using environment variables."""
@@ -13,40 +37,306 @@ def get_db_connection():
     except Exception as e:
         raise Exception(f"Database connection error: {str(e)}")
 
-def load_market_symbols():
-    """Load all market symbols from the database."""
-    conn = get_db_connection()
+def is_connection_alive(conn):
+    """Check that a pooled connection still answers queries."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def close_connection(conn):
+    """Close a connection, ignoring errors from connections that are already broken."""
     try:
-        query = "SELECT symbol, description FROM market_symbols ORDER BY symbol"
-        return pd.read_sql_query(query, conn)
-    finally:
         conn.close()
+    except psycopg2.Error:
+        pass
+
+class ConnectionPool:
+    """Thread-safe pool of database connections shared by every session.
+
+    Idle connections are reused most-recently-used first, pinged before reuse
+    when they have been idle for a while, and closed after the idle timeout.
+    At most max_size connections are open at once; callers wait for a free
+    one up to acquire_timeout seconds.
+    """
+
+    def __init__(self, connect, max_size, idle_timeout, acquire_timeout, check_after):
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.check_after = check_after
+        self.idle = []  # (connection, time it was returned)
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.metrics = {
+            'acquired': 0,
+            'created': 0,
+            'reused': 0,
+            'closed': 0,
+            'failed_checks': 0,
+            'waits': 0,
+            'timeouts': 0
+        }
+
+    def close_expired(self):
+        """Close idle connections past the idle timeout. Caller holds the lock."""
+        now = time.monotonic()
+        expired = [conn for conn, returned_at in self.idle if now - returned_at > self.idle_timeout]
+        if expired:
+            self.idle = [(conn, returned_at) for conn, returned_at in self.idle if now - returned_at <= self.idle_timeout]
+            for conn in expired:
+                close_connection(conn)
+            self.metrics['closed'] += len(expired)
+
+    def acquire(self):
+        """Check out a healthy connection, opening one if the pool has room."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self.condition:
+            while True:
+                self.close_expired()
+                if self.idle or self.in_use + len(self.idle) < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics['timeouts'] += 1
+                    raise Exception("Database connection error: connection pool exhausted")
+                self.metrics['waits'] += 1
+                self.condition.wait(remaining)
+
+            conn, returned_at = self.idle.pop() if self.idle else (None, None)
+            self.in_use += 1
+            self.metrics['acquired'] += 1
+
+        if conn is not None:
+            if not conn.closed and (time.monotonic() - returned_at < self.check_after or is_connection_alive(conn)):
+                with self.condition:
+                    self.metrics['reused'] += 1
+                return conn
+
+            close_connection(conn)
+            with self.condition:
+                self.metrics['failed_checks'] += 1
+                self.metrics['closed'] += 1
+
+        try:
+            conn = self.connect()
+        except Exception:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.metrics['created'] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if not discard and not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        keep = not discard and not conn.closed
+        if not keep:
+            close_connection(conn)
+
+        with self.condition:
+            self.in_use -= 1
+            if keep:
+                self.idle.append((conn, time.monotonic()))
+            else:
+                self.metrics['closed'] += 1
+            self.condition.notify()
+
+    def stats(self):
+        """Return pool usage and lifetime counters."""
+        with self.condition:
+            return {
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                **self.metrics
+            }
 
-def import_market_symbols_from_file(file_path):
-    """Import market symbols from a text file into the database."""
-    conn = get_db_connection()
+CONNECTION_POOL = None
+POOL_LOCK = threading.Lock()
+
+def get_connection_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global CONNECTION_POOL
+    with POOL_LOCK:
+        if CONNECTION_POOL is None:
+            CONNECTION_POOL = ConnectionPool(
+                get_db_connection,
+                DB_POOL_MAX_SIZE,
+                DB_POOL_IDLE_TIMEOUT,
+                DB_POOL_ACQUIRE_TIMEOUT,
+                DB_POOL_CHECK_AFTER
+            )
+        return CONNECTION_POOL
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled database connection for the duration of a with block.
+
+    Uncommitted work is rolled back when the connection is returned, and
+    connections that fail with a connection-level error are discarded.
+    """
+    pool = get_connection_pool()
+    conn = pool.acquire()
+    discard = False
     try:
-        with open(file_path, 'r') as f:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    finally:
+        pool.release(conn, discard)
+
+def get_pool_stats():
+    """Return connection pool metrics, or an empty dict before the pool is first used."""
+    with POOL_LOCK:
+        pool = CONNECTION_POOL
+    return pool.stats() if pool else {}
+
+# Published as app_db_pool_* on /metrics and in the debug panel
+register_metric_source(
+    'db_pool', get_pool_stats,
+    counters=('acquired', 'created', 'reused', 'closed', 'failed_checks', 'waits', 'timeouts')
+)
+
+def get_symbols_version():
+    """Return a counter that changes whenever market symbols are imported."""
+    return SYMBOLS_VERSION
+
+def bump_symbols_version():
+    """Mark cached copies of the market symbols as stale."""
+    global SYMBOLS_VERSION
+    with SYMBOLS_VERSION_LOCK:
+        SYMBOLS_VERSION += 1
+
+def fetch_market_symbols():
+    """Fetch all market symbols as rows of symbol and description."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT symbol, description FROM market_symbols ORDER BY symbol")
+        return cursor.fetchall()
+
+def load_market_symbols():
+    """Load all market symbols from the database."""
+    import pandas as pd
+
+    return pd.DataFrame(fetch_market_symbols(), columns=['symbol', 'description'])
+
+def parse_symbol_line(line):
+    """Split a 'SYMBOL<tab>Description' line into (symbol, description), or None if blank."""
+    line = line.strip()
+    if not line:
+        return None
+    # Split on tab character and handle potential missing description
+    parts = line.split('\t', 1)
+    return parts[0], parts[1] if len(parts) > 1 else ''
+
+def symbol_csv_chunks(lines, chunk_size):
+    """Yield CSV buffers of (line_no, symbol, description) rows, chunk_size rows each."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = 0
+    for line_no, line in enumerate(lines, start=1):
+        parsed = parse_symbol_line(line)
+        if parsed is None:
+            continue
+        writer.writerow((line_no, *parsed))
+        rows += 1
+        if rows == chunk_size:
+            buffer.seek(0)
+            yield buffer
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            rows = 0
+    if rows:
+        buffer.seek(0)
+        yield buffer
+
+@contextmanager
+def open_symbol_source(source):
+    """Open a symbol file path, or wrap an uploaded (binary or text) file, as text lines."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8-sig') as f:
+            yield f
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        text = io.TextIOWrapper(source, encoding='utf-8-sig')
+        try:
+            yield text
+        finally:
+            # Leave the caller's file open
+            text.detach()
+
+def import_market_symbols_from_file(source, chunk_size=None):
+    """Import market symbols from a tab-separated file into the database.
+
+    `source` is a file path or an open file, such as a Streamlit upload. Lines
+    are streamed in chunks into a staging table with COPY, then merged into
+    market_symbols with one upsert; when a symbol appears more than once the
+    last line wins. Returns a dict of inserted, updated and unchanged counts.
+    """
+    chunk_size = chunk_size or SYMBOL_IMPORT_CHUNK_SIZE
+    with db_connection() as conn:
+        try:
             cursor = conn.cursor()
-            for line in f:
-                if line.strip():
-                    # Split on tab character and handle potential missing description
-                    parts = line.strip().split('\t', 1)
-                    symbol = parts[0]
-                    description = parts[1] if len(parts) > 1 else ''
-                    
-                    # Use UPSERT to avoid duplicates
-                    cursor.execute("""
-                        INSERT INTO market_symbols (symbol, description)
-                        VALUES (%s, %s)
-                        ON CONFLICT (symbol) DO UPDATE 
-                        SET description = EXCLUDED.description,
-                            updated_at = CURRENT_TIMESTAMP
-                    """, (symbol, description))
-            
+            cursor.execute("""
+                CREATE TEMPORARY TABLE market_symbols_staging (
+                    line_no BIGINT,
+                    symbol TEXT,
+                    description TEXT
+                ) ON COMMIT DROP
+            """)
+
+            with open_symbol_source(source) as lines:
+                for chunk in symbol_csv_chunks(lines, chunk_size):
+                    cursor.copy_expert("""
+                        COPY market_symbols_staging (line_no, symbol, description)
+                        FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (symbol, description))
+                    """, chunk)
+
+            cursor.execute("""
+                WITH latest AS (
+                    SELECT DISTINCT ON (symbol) symbol, description
+                    FROM market_symbols_staging
+                    ORDER BY symbol, line_no DESC
+                ), upserted AS (
+                    INSERT INTO market_symbols (symbol, description)
+                    SELECT symbol, description FROM latest
+                    ON CONFLICT (symbol) DO UPDATE
+                    SET description = EXCLUDED.description,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE market_symbols.description IS DISTINCT FROM EXCLUDED.description
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT
+                    (SELECT COUNT(*) FROM latest) AS total,
+                    COUNT(*) FILTER (WHERE inserted) AS inserted,
+                    COUNT(*) FILTER (WHERE NOT inserted) AS updated
+                FROM upserted
+            """)
+            result = cursor.fetchone()
             conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error importing market symbols: {str(e)}")
-    finally:
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error importing market symbols: {str(e)}")
+
+    bump_symbols_version()
+
+    return {
+        'inserted': result['inserted'],
+        'updated': result['updated'],
+        'unchanged': result['total'] - result['inserted'] - result['updated']
+    }
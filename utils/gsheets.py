@@ -1,33 +1,153 @@
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 import pandas as pd
-import numpy as np
 import streamlit as st
+import hashlib
 import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from utils.compaction import compact_dataframe
+from utils.metrics import timed
+from utils.search_index import build_search_indexes
+from utils.sheet_schemas import apply_schema, column_kinds, get_sheet_schema, unparsed_columns
+from utils.view_cache import VIEW_CACHE
+from utils.snapshot_cache import (
+    read_snapshot, read_snapshot_meta, write_snapshot, is_snapshot_current,
+    publish_snapshot, touch_published_snapshot, get_published_snapshot,
+    unpublish_snapshot, expire_snapshots
+)
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',  # Allow read & write
+    'https://www.googleapis.com/auth/drive.metadata.readonly'  # Read file revision
+]
+
+# Timeout in seconds for each Google API request
+HTTP_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+# Idle keep-alive connections kept for reuse by any thread
+HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', '8'))
+
+def load_google_credentials():
+    """Load service account credentials from Streamlit Secrets."""
+    if "GOOGLE_CREDENTIALS" not in st.secrets:
+        raise Exception("Google Sheets credentials not found in Streamlit Secrets.")
+
+    # The Google client libraries are slow to import; load them on first use
+    from google.oauth2.service_account import Credentials
+
+    creds_json = json.loads(st.secrets["GOOGLE_CREDENTIALS"])
+    return Credentials.from_service_account_info(creds_json, scopes=SCOPES)
+
+class HttpPool:
+    """Keep-alive HTTP connections shared by every thread.
+
+    httplib2 is not thread-safe, so each request checks an authorized
+    connection out of the pool and returns it afterwards. Streamlit runs
+    every rerun on a new thread, so pooling per process (not per thread)
+    is what lets page loads reuse an open TLS connection. All connections
+    share one set of credentials, whose access token is refreshed whenever
+    it has expired.
+    """
+
+    def __init__(self, credentials, max_idle=HTTP_POOL_SIZE):
+        self.credentials = credentials
+        self.idle = queue.LifoQueue(maxsize=max_idle)
+
+    def checkout(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            from google_auth_httplib2 import AuthorizedHttp
+            import httplib2
+
+            return AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
+    def checkin(self, http):
+        try:
+            self.idle.put_nowait(http)
+        except queue.Full:
+            http.close()
+
+    def request(self, *args, **kwargs):
+        """Send one request over a pooled connection (the httplib2.Http interface)."""
+        http = self.checkout()
+        response = http.request(*args, **kwargs)
+        # Connections that raised may be half-open, so only successful ones are reused
+        self.checkin(http)
+        return response
+
+    def close(self):
+        """Close the idle connections."""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+@st.cache_resource
+def get_google_clients():
+    """Build the Sheets and Drive clients once per process.
+
+    Both clients send their requests through one shared HttpPool, so they
+    can be used from several session threads at once.
+    """
+    from googleapiclient.discovery import build
+
+    http = HttpPool(load_google_credentials())
+    sheets = build('sheets', 'v4', http=http)
+    drive = build('drive', 'v3', http=http)
+    return sheets, drive
 
 def create_google_service():
-    """Create Google Sheets service using credentials from Streamlit Secrets."""
+    """Return the shared Google Sheets service."""
     try:
-        # Load credentials from Streamlit Secrets
-        if "GOOGLE_CREDENTIALS" not in st.secrets:
-            st.error("Google Sheets credentials not found in Streamlit Secrets.")
-            return None
-
-        creds_json = json.loads(st.secrets["GOOGLE_CREDENTIALS"])
-        credentials = Credentials.from_service_account_info(
-            creds_json,
-            scopes=['https://www.googleapis.com/auth/spreadsheets']  # Allow read & write
-        )
-        service = build('sheets', 'v4', credentials=credentials)
-        return service
+        return get_google_clients()[0]
 
     except Exception as e:
         st.error(f"Failed to create Google Sheets service: {str(e)}")
         return None
 
+def create_drive_service():
+    """Return the shared Google Drive service used for revision lookups."""
+    try:
+        return get_google_clients()[1]
+
+    except Exception as e:
+        st.error(f"Failed to create Google Drive service: {str(e)}")
+        return None
+
+@st.cache_data(ttl=30)
+def get_spreadsheet_revision(spreadsheet_id):
+    """Return the spreadsheet's current Drive revision, or None if unavailable."""
+    service = create_drive_service()
+    if not service:
+        return None
+
+    try:
+        file_info = service.files().get(
+            fileId=spreadsheet_id,
+            fields='version,modifiedTime',
+            supportsAllDrives=True
+        ).execute()
+        return f"{file_info.get('version')}:{file_info.get('modifiedTime')}"
+    except Exception as e:
+        # Without a revision, snapshots are trusted for PUBLISH_TTL (see is_snapshot_current)
+        logger.warning(
+            "Revision lookup failed for spreadsheet %s (is the Drive API enabled and "
+            "the drive.metadata.readonly scope granted?): %s", spreadsheet_id, e
+        )
+        return None
+
 def get_sample_data():
     """Generate sample data for testing."""
+    import numpy as np
+
     data = {
         'Date': pd.date_range(start='2024-01-01', periods=100),
         'Sales': np.random.randint(1000, 10000, 100),
@@ -37,66 +157,388 @@ def get_sample_data():
     }
     return pd.DataFrame(data)
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_sheet_data(spreadsheet_id, range_name):
-    """Load data from Google Sheets with caching."""
+@st.cache_data(ttl=3600)  # Sheet layout changes far less often than its data
+def get_sheet_properties(spreadsheet_id):
+    """Return the properties of every sheet in a spreadsheet, keyed by title.
+
+    Only the title, sheetId and gridProperties fields are requested.
+    """
+    service = create_google_service()
+    if not service:
+        raise Exception("Failed to create Google Sheets service")
+
+    sheet_metadata = service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties(title,sheetId,gridProperties)'
+    ).execute()
+
+    return {
+        sheet['properties']['title']: sheet['properties']
+        for sheet in sheet_metadata.get('sheets', [])
+    }
+
+def find_sheet_properties(spreadsheet_id, sheet_name):
+    """Look up a sheet's properties, refreshing the metadata cache if the title is missing."""
+    properties = get_sheet_properties(spreadsheet_id)
+    if sheet_name not in properties:
+        # The sheet may have been added or renamed since the metadata was cached
+        get_sheet_properties.clear()
+        properties = get_sheet_properties(spreadsheet_id)
+    return properties.get(sheet_name)
+
+def get_sheet_grid_properties(spreadsheet_id, sheet_name):
+    """Return a sheet's grid properties (rowCount, columnCount, ...), or None."""
+    properties = find_sheet_properties(spreadsheet_id, sheet_name)
+    return properties.get('gridProperties') if properties else None
+
+def fallback_data(snapshot_df, reason):
+    """Return the last saved snapshot, or sample data if there is none."""
+    if snapshot_df is not None:
+        st.warning(f"{reason} Showing the last saved snapshot.")
+        return snapshot_df
+
+    st.error(f"{reason} Using sample data.")
+    return get_sample_data()
+
+def parse_range(range_name):
+    """Split an A1 range like 'Sheet'!A1:D1000 into its parts.
+
+    Returns (sheet_name, start_col, start_row, end_col, end_row), where
+    end_row is None for open-ended ranges such as 'Sheet'!A1:D.
+    """
+    match = re.match(r"^'?(.+?)'?!([A-Z]+)(\d+):([A-Z]+)(\d*)$", range_name)
+    if not match:
+        return None
+    sheet_name, start_col, start_row, end_col, end_row = match.groups()
+    return sheet_name, start_col, int(start_row), end_col, int(end_row) if end_row else None
+
+def row_hash(row, width):
+    """Hash a raw sheet row, padding the trailing cells the API omits."""
+    padded = list(row) + [''] * (width - len(row))
+    return hashlib.sha1(json.dumps(padded).encode('utf-8')).hexdigest()
+
+def snapshot_tail_info(header, rows):
+    """Build the snapshot metadata used to resume incremental loads."""
+    return {
+        'row_count': len(rows),
+        'tail_hash': row_hash(rows[-1], len(header)) if rows else None
+    }
+
+def values_to_dataframe(header, rows, sheet_name=None):
+    """Convert raw sheet values into a typed DataFrame using the sheet's schema."""
+    # Unformatted header cells may come back as numbers
+    raw_df = pd.DataFrame(rows, columns=[str(col) for col in header])
+    with timed('sheets_apply_schema', rows=len(rows)):
+        return apply_schema(raw_df, get_sheet_schema(sheet_name))
+
+def tail_range_name(range_name, snapshot_meta):
+    """Return the range covering a snapshot's last row and everything after it.
+
+    Returns None if the snapshot cannot be resumed incrementally.
+    """
+    parts = parse_range(range_name)
+    if not parts or not snapshot_meta:
+        return None
+    if not snapshot_meta.get('row_count') or not snapshot_meta.get('tail_hash'):
+        return None
+
+    sheet_name, start_col, start_row, end_col, end_row = parts
+    tail_row = start_row + snapshot_meta['row_count']
+    if end_row is not None and tail_row > end_row:
+        return None
+    return f"'{sheet_name}'!{start_col}{tail_row}:{end_col}{end_row or ''}"
+
+def append_tail_values(snapshot_df, snapshot_meta, values):
+    """Append the rows fetched from a tail range to a snapshot.
+
+    The first fetched row must match the tail hash stored in the snapshot.
+    Returns (DataFrame, tail_info), or (None, None) when the sheet changed in
+    a way that needs a full reload.
+    """
+    header = list(snapshot_df.columns)
+    if not values or row_hash(values[0], len(header)) != snapshot_meta['tail_hash']:
+        return None, None
+
+    new_rows = values[1:]
+    tail_info = {
+        'row_count': snapshot_meta['row_count'] + len(new_rows),
+        'tail_hash': row_hash(values[-1], len(header))
+    }
+    if not new_rows:
+        return snapshot_df, tail_info
+
+    # Parse the new rows with the snapshot's column types
+    raw_df = pd.DataFrame(new_rows, columns=header)
+    new_df = apply_schema(raw_df, column_kinds(snapshot_df))
+    if unparsed_columns(raw_df, new_df):
+        return None, None  # A typed column received values of another type
+
+    return pd.concat([snapshot_df, new_df], ignore_index=True), tail_info
+
+# Ranges not requested by any page for this many seconds are unregistered
+SHEET_RANGE_TTL = int(os.getenv('SHEET_RANGE_TTL', '3600'))
+
+# At most this many ranges are registered; the least recently requested go first
+MAX_SHEET_RANGES = int(os.getenv('MAX_SHEET_RANGES', '32'))
+
+# Requested ranges, keyed by (spreadsheet_id, range_name), mapped to
+# (incremental, last requested time), least recently requested first
+SHEET_RANGES = OrderedDict()
+SHEET_RANGES_LOCK = threading.Lock()
+
+def build_range_name(sheet_name, start_col, start_row, end_col, end_row=None):
+    """Build an A1 range string for a sheet; without end_row it runs to the last row."""
+    return f"'{sheet_name}'!{start_col}{start_row}:{end_col}{end_row or ''}"
+
+def register_sheet_range(spreadsheet_id, range_name, incremental=False):
+    """Register a range so it is fetched together with its spreadsheet's other ranges.
+
+    Registering again marks the range as recently requested.
+    """
+    key = (spreadsheet_id, range_name)
+    with SHEET_RANGES_LOCK:
+        SHEET_RANGES[key] = (incremental, time.time())
+        SHEET_RANGES.move_to_end(key)
+        evicted = []
+        while len(SHEET_RANGES) > MAX_SHEET_RANGES:
+            evicted.append(SHEET_RANGES.popitem(last=False)[0])
+    for evicted_key in evicted:
+        unpublish_snapshot(*evicted_key)
+
+def unregister_sheet_range(spreadsheet_id, range_name):
+    """Stop fetching and refreshing a range, and drop its published frame."""
+    with SHEET_RANGES_LOCK:
+        SHEET_RANGES.pop((spreadsheet_id, range_name), None)
+    unpublish_snapshot(spreadsheet_id, range_name)
+
+def expire_idle_ranges():
+    """Unregister ranges that have not been requested within SHEET_RANGE_TTL."""
+    cutoff = time.time() - SHEET_RANGE_TTL
+    with SHEET_RANGES_LOCK:
+        idle = [key for key, (_, requested_at) in SHEET_RANGES.items() if requested_at < cutoff]
+        for key in idle:
+            del SHEET_RANGES[key]
+    for key in idle:
+        unpublish_snapshot(*key)
+    return idle
+
+def get_registered_ranges(spreadsheet_id):
+    """Return the registered ranges of a spreadsheet and their incremental flags."""
+    return get_all_registered_ranges().get(spreadsheet_id, {})
+
+def is_client_error(error):
+    """Check whether a Google API error is a 4xx that retrying will not fix."""
+    status = int(getattr(error.resp, 'status', 0))
+    return 400 <= status < 500 and status not in (408, 429)
+
+def fetch_sheet_ranges(service, spreadsheet_id, range_names, revision, incremental_ranges=()):
+    """Fetch several ranges with a single values().batchGet call.
+
+    Incremental ranges with a resumable snapshot only request their tail.
+    Every fetched range is written to the snapshot cache. Returns a dict of
+    range name -> DataFrame (None for empty ranges).
+    """
+    requests = {}
+    snapshots = {}
+    for range_name in range_names:
+        request_range = range_name
+        if range_name in incremental_ranges:
+            snapshot_df, snapshot_meta = read_snapshot(spreadsheet_id, range_name)
+            tail_range = tail_range_name(range_name, snapshot_meta) if snapshot_df is not None else None
+            if tail_range:
+                snapshots[range_name] = (snapshot_df, snapshot_meta)
+                request_range = tail_range
+        requests[range_name] = request_range
+
+    # Unformatted values arrive already typed: numbers as numbers, dates as serials
+    with timed('sheets_fetch', ranges=len(requests)):
+        result = service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=list(requests.values()),
+            valueRenderOption='UNFORMATTED_VALUE',
+            dateTimeRenderOption='SERIAL_NUMBER'
+        ).execute()
+
+    frames = {}
+    reload_ranges = []
+    for range_name, value_range in zip(requests, result.get('valueRanges', [])):
+        values = value_range.get('values', [])
+
+        sheet_name = range_name.split('!')[0].strip("'")
+
+        with timed('sheets_parse', rows=len(values)):
+            if range_name in snapshots:
+                df, tail_info = append_tail_values(*snapshots[range_name], values)
+            elif values:
+                df = values_to_dataframe(values[0], values[1:], sheet_name)
+                tail_info = snapshot_tail_info(values[0], values[1:])
+            else:
+                df = None
+
+        if df is None:
+            if range_name in snapshots:
+                reload_ranges.append(range_name)
+            else:
+                frames[range_name] = None
+            continue
+
+        with timed('sheets_compact', rows=len(df)):
+            df, bytes_saved = compact_dataframe(df, get_sheet_schema(sheet_name))
+        with timed('snapshot_write', rows=len(df)):
+            write_snapshot(
+                spreadsheet_id, range_name, df, revision,
+                {**tail_info, 'bytes_saved': bytes_saved}
+            )
+        with timed('search_index_build', rows=len(df)):
+            build_search_indexes(df)
+        frames[range_name] = df
+
+    if reload_ranges:
+        frames.update(fetch_sheet_ranges(service, spreadsheet_id, reload_ranges, revision))
+
+    return frames
+
+def get_all_registered_ranges():
+    """Return the recently requested ranges of every spreadsheet and their incremental flags."""
+    expire_idle_ranges()
+    ranges = {}
+    with SHEET_RANGES_LOCK:
+        for (spreadsheet_id, range_name), (incremental, _) in SHEET_RANGES.items():
+            ranges.setdefault(spreadsheet_id, {})[range_name] = incremental
+    return ranges
+
+def refresh_stale_ranges(service, spreadsheet_id, revision):
+    """Bring every registered range of a spreadsheet up to date.
+
+    Current snapshots are published from disk, and all stale ranges are
+    fetched in one batch. Ranges the API rejects with a client error (unknown
+    spreadsheet or sheet, bad range, no access) are unregistered. Returns the
+    freshly fetched frames by range name. Makes no Streamlit UI calls, so the
+    background refresher can use it.
+    """
+    from googleapiclient.errors import HttpError
+
+    registered = get_registered_ranges(spreadsheet_id)
+    stale_ranges = []
+    for range_name in registered:
+        snapshot_meta = read_snapshot_meta(spreadsheet_id, range_name)
+        if not is_snapshot_current(snapshot_meta, revision):
+            stale_ranges.append(range_name)
+        elif not touch_published_snapshot(spreadsheet_id, range_name, snapshot_meta['version']):
+            snapshot_df, snapshot_meta = read_snapshot(spreadsheet_id, range_name)
+            if snapshot_df is not None:
+                publish_snapshot(spreadsheet_id, range_name, snapshot_df, snapshot_meta)
+
+    try:
+        sheet_titles = get_sheet_properties(spreadsheet_id)
+    except HttpError as error:
+        if is_client_error(error):
+            for range_name in registered:
+                unregister_sheet_range(spreadsheet_id, range_name)
+        raise
+
+    # A missing sheet would fail the whole batch, so drop those ranges
+    for range_name in stale_ranges:
+        if range_name.split('!')[0].strip("'") not in sheet_titles:
+            unregister_sheet_range(spreadsheet_id, range_name)
+    stale_ranges = [
+        name for name in stale_ranges
+        if name.split('!')[0].strip("'") in sheet_titles
+    ]
+    if not stale_ranges:
+        return {}
+
+    incremental_ranges = {name for name in stale_ranges if registered[name]}
+    try:
+        return fetch_sheet_ranges(service, spreadsheet_id, stale_ranges, revision, incremental_ranges)
+    except HttpError as error:
+        if not is_client_error(error):
+            raise
+        if len(stale_ranges) == 1:
+            unregister_sheet_range(spreadsheet_id, stale_ranges[0])
+            raise
+
+    # One bad range fails the whole batch; fetch the ranges one by one to find it
+    frames = {}
+    for range_name in stale_ranges:
+        try:
+            frames.update(fetch_sheet_ranges(service, spreadsheet_id, [range_name], revision, incremental_ranges))
+        except HttpError as error:
+            if not is_client_error(error):
+                raise
+            unregister_sheet_range(spreadsheet_id, range_name)
+    return frames
+
+def clear_sheet_cache():
+    """Drop all cached sheet data so the next load fetches from Google."""
+    st.cache_data.clear()
+    expire_snapshots()
+    VIEW_CACHE.clear()
+
+def load_sheet_data(spreadsheet_id, range_name, incremental=False):
+    """Load data from Google Sheets with caching.
+
+    Parsed frames are published in memory and persisted as on-disk snapshots,
+    which are served until the spreadsheet's revision changes. The background
+    refresher keeps published frames current, so page renders normally never
+    wait on Google. With incremental=True the sheet is treated as append-only
+    and only rows after the snapshot are fetched. Stale ranges registered for
+    the same spreadsheet are fetched in the same batch request.
+    """
+    register_sheet_range(spreadsheet_id, range_name, incremental)
+    with timed('snapshot_published'):
+        published_df = get_published_snapshot(spreadsheet_id, range_name)
+    if published_df is not None:
+        return published_df
+
+    with timed('sheets_revision'):
+        revision = get_spreadsheet_revision(spreadsheet_id)
+    with timed('snapshot_read'):
+        snapshot_df, snapshot_meta = read_snapshot(spreadsheet_id, range_name)
+    if snapshot_df is not None and is_snapshot_current(snapshot_meta, revision):
+        publish_snapshot(spreadsheet_id, range_name, snapshot_df, snapshot_meta)
+        return snapshot_df
+
     try:
         service = create_google_service()
         if not service:
-            st.error("Failed to create Google Sheets service. Using sample data.")
-            return get_sample_data()
+            return fallback_data(snapshot_df, "Failed to create Google Sheets service.")
 
-        # First, get the sheet metadata to determine if the sheet exists
-        try:
-            sheet_metadata = service.spreadsheets().get(
-                spreadsheetId=spreadsheet_id
-            ).execute()
+        from googleapiclient.errors import HttpError
 
+        # Check against the cached sheet metadata that the sheet exists
+        try:
             # Extract sheet name from range
             sheet_name = range_name.split('!')[0].strip("'")
 
-            # Find the specified sheet
-            sheet_found = any(
-                sheet['properties']['title'] == sheet_name
-                for sheet in sheet_metadata.get('sheets', [])
-            )
-
-            if not sheet_found:
-                st.error(f"Sheet '{sheet_name}' not found. Using sample data.")
-                return get_sample_data()
+            if not find_sheet_properties(spreadsheet_id, sheet_name):
+                unregister_sheet_range(spreadsheet_id, range_name)
+                return fallback_data(snapshot_df, f"Sheet '{sheet_name}' not found.")
 
         except Exception as e:
-            st.error(f"Failed to get sheet metadata: {str(e)}")
-            return get_sample_data()
+            # An unknown or inaccessible spreadsheet will not start working on a retry
+            if isinstance(e, HttpError) and is_client_error(e):
+                unregister_sheet_range(spreadsheet_id, range_name)
+            return fallback_data(snapshot_df, f"Failed to get sheet metadata: {str(e)}.")
 
-        # Get the data with the proper range format
+        # Fetch this range together with every other stale registered range
         try:
-            result = service.spreadsheets().values().get(
-                spreadsheetId=spreadsheet_id,
-                range=range_name
-            ).execute()
-
-            values = result.get('values', [])
-            if not values:
-                st.warning('No data found in the specified range.')
-                return None
+            frames = refresh_stale_ranges(service, spreadsheet_id, revision)
 
-            # Convert to DataFrame
-            df = pd.DataFrame(values[1:], columns=values[0])
-
-            # Convert numeric columns to appropriate types
-            for col in df.columns:
-                try:
-                    df[col] = pd.to_numeric(df[col])
-                except ValueError:
-                    continue  # Keep text columns as-is
+            if range_name in frames:
+                df = frames[range_name]
+            else:
+                # Another thread refreshed this range in the meantime
+                df = get_published_snapshot(spreadsheet_id, range_name)
 
+            if df is None:
+                st.warning('No data found in the specified range.')
             return df
 
         except HttpError as error:
             st.error(f"Failed to load data: {str(error)}")
-            return None
+            return snapshot_df
 
     except Exception as e:
         st.error(f"An unexpected error occurred: {str(e)}")
-        return None
+        return snapshot_df
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (Prometheus defaults)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Recent durations kept per stage for percentiles in the debug panel
+RECENT_SAMPLES = 500
+
+# Log every span as a JSON line with METRICS_LOG_JSON=1
+LOG_SPANS_AS_JSON = os.getenv('METRICS_LOG_JSON', '0') == '1'
+
+# Serve Prometheus metrics on this port when set (e.g. METRICS_PORT=9108)
+METRICS_PORT = os.getenv('METRICS_PORT')
+
+logger = logging.getLogger(__name__)
+
+class StageHistogram:
+    """Duration histogram of one pipeline stage."""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        for position, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[position] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        """Count, total and recent mean/p50/p95/max, in seconds."""
+        recent = sorted(self.recent)
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': recent[len(recent) // 2] if recent else 0.0,
+            'p95': recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0,
+            'max': recent[-1] if recent else 0.0
+        }
+
+STAGE_HISTOGRAMS = {}
+METRICS_LOCK = threading.Lock()
+
+# Other modules' current values, by source name: (collect function, counter keys)
+METRIC_SOURCES = {}
+
+def register_metric_source(name, collect, counters=()):
+    """Export the values returned by collect() as app_<name>_<key> gauges.
+
+    Keys listed in `counters` are exported as counters (app_<name>_<key>_total).
+    """
+    with METRICS_LOCK:
+        METRIC_SOURCES[name] = (collect, frozenset(counters))
+
+def get_source_metrics():
+    """Return the current values of every registered source, keyed by source name."""
+    with METRICS_LOCK:
+        sources = sorted(METRIC_SOURCES.items())
+    values = {}
+    for name, (collect, _) in sources:
+        try:
+            values[name] = collect()
+        except Exception:
+            logger.exception("Failed to collect %s metrics", name)
+    return values
+
+def record_duration(stage, seconds, **fields):
+    """Add a stage duration to its histogram, and log it when JSON logging is on."""
+    with METRICS_LOCK:
+        histogram = STAGE_HISTOGRAMS.get(stage)
+        if histogram is None:
+            histogram = STAGE_HISTOGRAMS[stage] = StageHistogram()
+        histogram.observe(seconds)
+
+    if LOG_SPANS_AS_JSON:
+        logger.info(json.dumps({
+            'event': 'span',
+            'stage': stage,
+            'duration_ms': round(seconds * 1000, 3),
+            'thread': threading.current_thread().name,
+            **fields
+        }, default=str))
+
+@contextmanager
+def timed(stage, **fields):
+    """Time the enclosed block as one span of the given stage.
+
+    Extra fields (e.g. rows) are only added to the JSON log line.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_duration(stage, time.perf_counter() - start, **fields)
+
+def get_stage_summaries():
+    """Return the summary of every stage, keyed by stage name."""
+    with METRICS_LOCK:
+        return {stage: histogram.summary() for stage, histogram in sorted(STAGE_HISTOGRAMS.items())}
+
+def reset_metrics():
+    """Drop all recorded durations."""
+    with METRICS_LOCK:
+        STAGE_HISTOGRAMS.clear()
+
+def export_prometheus():
+    """Render the stage histograms in the Prometheus text exposition format."""
+    lines = [
+        '# HELP app_stage_duration_seconds Duration of app pipeline stages.',
+        '# TYPE app_stage_duration_seconds histogram'
+    ]
+    with METRICS_LOCK:
+        for stage, histogram in sorted(STAGE_HISTOGRAMS.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, histogram.bucket_counts):
+                cumulative += count
+                lines.append(f'app_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'app_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'app_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.total}')
+            lines.append(f'app_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+        counter_keys = {name: counters for name, (_, counters) in METRIC_SOURCES.items()}
+
+    for name, values in get_source_metrics().items():
+        for key, value in sorted(values.items()):
+            if key in counter_keys.get(name, ()):
+                metric, kind = f'app_{name}_{key}_total', 'counter'
+            else:
+                metric, kind = f'app_{name}_{key}', 'gauge'
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.append(f'{metric} {value}')
+    return '\n'.join(lines) + '\n'
+
+def export_json():
+    """Render the stage summaries and source values as a JSON document."""
+    return json.dumps({'stages': get_stage_summaries(), 'sources': get_source_metrics()}, indent=2)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics in Prometheus format."""
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = export_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port=None):
+    """Serve /metrics on a daemon thread if a port is configured. Returns the server or None."""
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    server = ThreadingHTTPServer(('0.0.0.0', int(port)), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    logger.info("Serving metrics on port %s", port)
+    return server
@@ -0,0 +1,84 @@
+"""Password hashing, run in worker processes.
+
+This module only depends on the standard library so that worker processes
+start quickly and never import Streamlit.
+"""
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# PBKDF2 work factor for new hashes; older hashes are upgraded on login
+PASSWORD_ITERATIONS = int(os.getenv('PASSWORD_ITERATIONS', '100000'))
+
+# Maximum number of hashes computed at once
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Hashes stored as 'salt:key' hex before the work factor was recorded
+LEGACY_ITERATIONS = 100000
+
+HASH_ALGORITHM = 'pbkdf2_sha256'
+
+def derive_key(password, salt, iterations):
+    """PBKDF2-SHA256 of a password."""
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+def compute_password_hash(password, iterations=None):
+    """Hash a password with a random salt as 'pbkdf2_sha256$iterations$salt$key'."""
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = os.urandom(32)
+    key = derive_key(password, salt, iterations)
+    return f"{HASH_ALGORITHM}${iterations}${salt.hex()}${key.hex()}"
+
+def parse_password_hash(stored_password):
+    """Split a stored hash into (iterations, salt, key); legacy 'salt:key' hashes included."""
+    if stored_password.startswith(HASH_ALGORITHM + '$'):
+        _, iterations, salt, key = stored_password.split('$')
+        return int(iterations), bytes.fromhex(salt), bytes.fromhex(key)
+
+    salt, key = stored_password.split(':')
+    return LEGACY_ITERATIONS, bytes.fromhex(salt), bytes.fromhex(key)
+
+def check_password(stored_password, provided_password):
+    """Check a password against a stored hash in constant time."""
+    try:
+        iterations, salt, stored_key = parse_password_hash(stored_password)
+    except ValueError:
+        return False
+    return hmac.compare_digest(stored_key, derive_key(provided_password, salt, iterations))
+
+def needs_rehash(stored_password):
+    """Check whether a stored hash uses an old format or a lower work factor."""
+    if not stored_password.startswith(HASH_ALGORITHM + '$'):
+        return True
+    iterations, _, _ = parse_password_hash(stored_password)
+    return iterations < PASSWORD_ITERATIONS
+
+PASSWORD_POOL = None
+POOL_LOCK = threading.Lock()
+
+def get_password_pool():
+    """Return the shared hashing process pool, starting it on first use."""
+    global PASSWORD_POOL
+    with POOL_LOCK:
+        if PASSWORD_POOL is None:
+            # Spawned workers do not inherit the server's threads and locks
+            PASSWORD_POOL = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return PASSWORD_POOL
+
+def run_in_pool(function, *args):
+    """Run a hashing function in the process pool, or inline if the pool is unavailable."""
+    global PASSWORD_POOL
+    try:
+        return get_password_pool().submit(function, *args).result()
+    except (BrokenProcessPool, OSError, RuntimeError):
+        # A crashed worker breaks the pool; start a new one for the next call
+        with POOL_LOCK:
+            PASSWORD_POOL = None
+        return function(*args)
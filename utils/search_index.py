@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from utils.snapshot_cache import get_snapshot_artifact
+
+# Text columns with at least this many distinct values get a search index
+MIN_INDEXED_UNIQUE = 10
+
+def trigrams(text):
+    """Return the set of 3-character substrings of a string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    """Inverted trigram index for case-insensitive substring search on a column.
+
+    The index is built over the column's distinct values, so repeated values
+    are indexed once. Queries intersect the posting lists of the query's
+    trigrams and verify only the remaining candidates.
+    """
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.categories.astype(str)
+            codes = series.cat.codes.to_numpy()
+        else:
+            codes, values = pd.factorize(series.astype(str))
+
+        self.codes = codes
+        self.values = [value.upper() for value in values]
+
+        postings = {}
+        for value_id, value in enumerate(self.values):
+            for gram in trigrams(value):
+                postings.setdefault(gram, []).append(value_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def matching_values(self, text):
+        """Return the ids of the distinct values containing the text."""
+        query = text.upper()
+        grams = trigrams(query)
+        if not grams:
+            # Queries shorter than a trigram are checked against every distinct value
+            candidates = range(len(self.values))
+        else:
+            lists = [self.postings.get(gram) for gram in grams]
+            if any(ids is None for ids in lists):
+                return np.array([], dtype=np.int32)
+            lists.sort(key=len)
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    break
+
+        return np.array(
+            [value_id for value_id in candidates if query in self.values[value_id]],
+            dtype=np.int32
+        )
+
+    def contains_mask(self, text):
+        """Boolean row mask of the rows whose value contains the text."""
+        hits = np.zeros(len(self.values) + 1, dtype=bool)  # Last slot: missing (-1)
+        hits[self.matching_values(text)] = True
+        return hits[self.codes]
+
+def get_search_index(df, column):
+    """Return the snapshot's search index for a text column, building it once.
+
+    Returns None when the frame is not a cached snapshot or the column has
+    too few distinct values to be worth indexing.
+    """
+    def build(snapshot_df):
+        series = snapshot_df[column]
+        if series.nunique() < MIN_INDEXED_UNIQUE:
+            return None
+        return TrigramIndex(series)
+
+    return get_snapshot_artifact(df, ('search_index', column), build)
+
+def build_search_indexes(df):
+    """Build the search indexes of every text column of a snapshot."""
+    for column in df.columns:
+        series = df[column]
+        if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)):
+            get_search_index(df, column)
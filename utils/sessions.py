@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import streamlit as st
+from typing import Any, Dict, Optional
+
+# Lifetime of a session token in seconds; it only needs to outlive a reload
+# or reconnect shortly after logging in
+SESSION_TTL = int(os.getenv('SESSION_TTL', str(15 * 60)))
+
+SESSION_SECRET = None
+SECRET_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+def get_session_secret() -> bytes:
+    """Return the token signing key from SESSION_SECRET or st.secrets['session_secret'].
+
+    Without one, a random key is used and sessions end when the server restarts.
+    """
+    global SESSION_SECRET
+    with SECRET_LOCK:
+        if SESSION_SECRET is None:
+            secret = os.getenv('SESSION_SECRET')
+            if not secret:
+                try:
+                    secret = st.secrets.get('session_secret')
+                except Exception:
+                    secret = None
+            if not secret:
+                logger.warning("SESSION_SECRET is not set; sessions will not survive a server restart")
+                secret = secrets.token_hex(32)
+            SESSION_SECRET = secret.encode('utf-8')
+        return SESSION_SECRET
+
+def encode_part(data: bytes) -> str:
+    """Unpadded URL-safe base64, so tokens fit in a query parameter."""
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def decode_part(text: str) -> bytes:
+    """Inverse of encode_part."""
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def sign(payload: str) -> str:
+    """HMAC-SHA256 signature of a token payload."""
+    return encode_part(hmac.new(get_session_secret(), payload.encode('ascii'), hashlib.sha256).digest())
+
+def create_session_token(user_id: int, username: str, generation: int, ttl: Optional[int] = None) -> str:
+    """Issue a signed token 'payload.signature' that expires after ttl seconds.
+
+    `generation` is the user's session generation; bumping it in the database
+    revokes every token issued before.
+    """
+    claims = {
+        'uid': user_id,
+        'usr': username,
+        'gen': generation,
+        'exp': int(time.time()) + (ttl or SESSION_TTL),
+        'jti': secrets.token_urlsafe(12)
+    }
+    payload = encode_part(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{sign(payload)}"
+
+def verify_session_token(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Return the claims of a correctly signed, unexpired token, or None.
+
+    Checked entirely in memory; whether the token's generation has been
+    revoked is checked by the caller.
+    """
+    if not token or token.count('.') != 1:
+        return None
+    payload, signature = token.split('.')
+    try:
+        if not hmac.compare_digest(signature, sign(payload)):
+            return None
+        claims = json.loads(decode_part(payload))
+    except (TypeError, ValueError):
+        return None
+
+    if not isinstance(claims, dict) or claims.get('exp', 0) <= time.time():
+        return None
+    return claims
@@ -1,9 +1,39 @@
+import atexit
+import hashlib
 import json
+import logging
+import os
+import threading
 import streamlit as st
+import time
+from collections import OrderedDict
 from typing import Dict, Any
-from utils.database import get_db_connection
+from utils.database import db_connection
+from utils.metrics import timed
 from datetime import date, datetime
 
+# Queued settings are written once they have not changed for this many seconds
+SETTINGS_SAVE_DELAY = float(os.getenv('SETTINGS_SAVE_DELAY', '2'))
+
+# Settings read or written by this process are trusted for this many seconds;
+# after that the database is read again, picking up changes made elsewhere
+SETTINGS_CACHE_TTL = float(os.getenv('SETTINGS_CACHE_TTL', '60'))
+
+# At most this many (user_id, page) entries are cached, least recently used first
+SETTINGS_CACHE_MAX_ENTRIES = int(os.getenv('SETTINGS_CACHE_MAX_ENTRIES', '1000'))
+
+# Hash of the settings last persisted per (user_id, page), kept past the TTL
+# so unchanged settings are never written again
+PERSISTED_HASHES = OrderedDict()
+
+# (copy, time) of the settings last persisted per (user_id, page), and queued writes
+PERSISTED_SETTINGS = OrderedDict()
+PENDING_SAVES = {}
+SAVE_TIMERS = {}
+SETTINGS_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder to handle date and datetime objects."""
     def default(self, obj):
@@ -53,33 +83,138 @@ def load_settings(page: str = "") -> Dict[str, Any]:
     if not user_id:
         return defaults
 
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        # Explicitly cast page to text to avoid type mismatch error
-        cursor.execute("""
-            SELECT settings
-            FROM user_preferences
-            WHERE user_id = %s AND page = %s::text  -- Casting page to text
-        """, (user_id, page))
-        result = cursor.fetchone()
-
-        if result:
-            # Extract settings from the result and update defaults
-            saved_settings = result[0] if isinstance(result[0], dict) else json.loads(result[0])
-            settings = defaults.copy()
-            settings.update(saved_settings)
-            return settings
-        return defaults
-    except Exception as e:
-        st.error(f"Error loading settings: {str(e)}")
-        return defaults
-    finally:
-        conn.close()
+    # Settings this process read or wrote within SETTINGS_CACHE_TTL need no round trip
+    cached_settings = get_cached_settings(user_id, page)
+    if cached_settings is not None:
+        settings = defaults.copy()
+        settings.update(cached_settings)
+        return settings
+
+    with timed('settings_load'), db_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            # Explicitly cast page to text to avoid type mismatch error
+            cursor.execute("""
+                SELECT settings
+                FROM user_preferences
+                WHERE user_id = %s AND page = %s::text  -- Casting page to text
+            """, (user_id, page))
+            result = cursor.fetchone()
+
+            if result:
+                # Extract settings from the result and update defaults
+                # Rows come from a RealDictCursor, so columns are read by name
+                saved_settings = result['settings']
+                if not isinstance(saved_settings, dict):
+                    saved_settings = json.loads(saved_settings)
+                mark_persisted(user_id, page, settings_hash(saved_settings), saved_settings)
+                settings = defaults.copy()
+                settings.update(saved_settings)
+                return settings
+            return defaults
+        except Exception as e:
+            st.error(f"Error loading settings: {str(e)}")
+            return defaults
+
+
+def settings_hash(settings: Dict[str, Any]) -> str:
+    """Hash the serialized settings so unchanged settings can be detected."""
+    settings_json = json.dumps(settings, cls=DateTimeEncoder, sort_keys=True)
+    return hashlib.sha256(settings_json.encode('utf-8')).hexdigest()
+
+def is_persisted(user_id: int, page: str, digest: str) -> bool:
+    """Check whether these settings are already the last ones persisted."""
+    with SETTINGS_LOCK:
+        return persisted_hash(user_id, page) == digest
+
+def copy_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy settings as they would read back from the database."""
+    return json.loads(json.dumps(settings, cls=DateTimeEncoder))
+
+def mark_persisted(user_id: int, page: str, digest: str, settings: Dict[str, Any]):
+    """Remember the settings last persisted for a user and page, and their hash."""
+    settings = copy_settings(settings)
+    key = (user_id, page)
+    with SETTINGS_LOCK:
+        for cache, value in ((PERSISTED_HASHES, digest), (PERSISTED_SETTINGS, (settings, time.time()))):
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > SETTINGS_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+
+def get_persisted(user_id: int, page: str):
+    """Return the (settings, time) entry persisted within the TTL, or None.
+
+    Call with SETTINGS_LOCK held.
+    """
+    key = (user_id, page)
+    entry = PERSISTED_SETTINGS.get(key)
+    if entry is None:
+        return None
+    if time.time() - entry[1] > SETTINGS_CACHE_TTL:
+        del PERSISTED_SETTINGS[key]
+        return None
+    PERSISTED_SETTINGS.move_to_end(key)
+    return entry
+
+def persisted_hash(user_id: int, page: str):
+    """Hash of the settings last persisted, or None. Call with SETTINGS_LOCK held."""
+    key = (user_id, page)
+    digest = PERSISTED_HASHES.get(key)
+    if digest is not None:
+        PERSISTED_HASHES.move_to_end(key)
+    return digest
+
+def get_cached_settings(user_id: int, page: str):
+    """Return a copy of the newest known settings (queued or recently persisted), or None."""
+    with SETTINGS_LOCK:
+        pending = PENDING_SAVES.get((user_id, page))
+        if pending:
+            return copy_settings(pending[0])
+        entry = get_persisted(user_id, page)
+        return copy_settings(entry[0]) if entry else None
+
+def write_settings(user_id: int, page: str, settings: Dict[str, Any]) -> bool:
+    """Upsert a user's settings for a page. Raises on database errors."""
+    with timed('settings_save'), db_connection() as conn:
+        try:
+            cursor = conn.cursor()
 
+            # Ensure settings are properly serialized with date handling
+            settings_json = json.dumps(settings, cls=DateTimeEncoder)
+
+            # Insert or update settings
+            cursor.execute("""
+                INSERT INTO user_preferences (user_id, page, settings)
+                VALUES (%s, %s, %s::jsonb)
+                ON CONFLICT (user_id, page) 
+                DO UPDATE SET 
+                    settings = EXCLUDED.settings,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING user_id
+            """, (user_id, page, settings_json))
+
+            result = cursor.fetchone()
+            conn.commit()
+            return bool(result)
+        except Exception:
+            conn.rollback()
+            raise
+
+def cancel_pending_save(user_id: int, page: str):
+    """Drop a queued write for a user and page."""
+    with SETTINGS_LOCK:
+        PENDING_SAVES.pop((user_id, page), None)
+        timer = SAVE_TIMERS.pop((user_id, page), None)
+    if timer:
+        timer.cancel()
 
 def save_settings(settings: Dict[str, Any], page: str = "") -> bool:
-    """Save user-specific settings to database."""
+    """Save user-specific settings to database.
+
+    Settings identical to the last ones persisted for the user and page are
+    not written again.
+    """
     # Ensure user is logged in
     user_id = st.session_state.get('user_id')
     if not user_id:
@@ -90,33 +225,87 @@ def save_settings(settings: Dict[str, Any], page: str = "") -> bool:
         st.error("Invalid settings format")
         return False
 
-    conn = get_db_connection()
+    # An explicit save supersedes any queued one
+    cancel_pending_save(user_id, page)
+
+    digest = settings_hash(settings)
+    if is_persisted(user_id, page, digest):
+        return True
+
     try:
-        cursor = conn.cursor()
-
-        # Ensure settings are properly serialized with date handling
-        settings_json = json.dumps(settings, cls=DateTimeEncoder)
-
-        # Insert or update settings
-        cursor.execute("""
-            INSERT INTO user_preferences (user_id, page, settings)
-            VALUES (%s, %s, %s::jsonb)
-            ON CONFLICT (user_id, page) 
-            DO UPDATE SET 
-                settings = EXCLUDED.settings,
-                updated_at = CURRENT_TIMESTAMP
-            RETURNING user_id
-        """, (user_id, page, settings_json))
-
-        result = cursor.fetchone()
-        conn.commit()
-
-        if result:
-            return True
-        return False
+        saved = write_settings(user_id, page, settings)
     except Exception as e:
-        conn.rollback()
         st.error(f"Error saving settings: {str(e)}")
         return False
-    finally:
-        conn.close()
+
+    if saved:
+        mark_persisted(user_id, page, digest, settings)
+    return saved
+
+def flush_settings(user_id: int, page: str):
+    """Write the queued settings for a user and page, if any.
+
+    The queued entry stays visible to load_settings until the write has
+    succeeded. A failed write stays queued for the next flush.
+    """
+    key = (user_id, page)
+    with SETTINGS_LOCK:
+        pending = PENDING_SAVES.get(key)
+        SAVE_TIMERS.pop(key, None)
+    if pending is None:
+        return
+
+    settings, digest = pending
+    try:
+        saved = write_settings(user_id, page, settings)
+    except Exception as e:
+        logger.error("Error saving %s settings for user %s: %s", page, user_id, e)
+        return
+
+    if saved:
+        mark_persisted(user_id, page, digest, settings)
+        with SETTINGS_LOCK:
+            # Settings queued while the write ran are newer; leave them queued
+            if PENDING_SAVES.get(key) is pending:
+                del PENDING_SAVES[key]
+
+def flush_pending_settings():
+    """Write every queued settings change now."""
+    with SETTINGS_LOCK:
+        keys = list(PENDING_SAVES)
+    for user_id, page in keys:
+        flush_settings(user_id, page)
+
+def queue_settings_save(settings: Dict[str, Any], page: str = "") -> bool:
+    """Persist settings in the background once they stop changing.
+
+    Unchanged settings are skipped. Changes made within SETTINGS_SAVE_DELAY
+    seconds of each other are coalesced into a single write. Returns True if
+    a write was queued.
+    """
+    user_id = st.session_state.get('user_id')
+    if not user_id or not isinstance(settings, dict):
+        return False
+
+    digest = settings_hash(settings)
+    key = (user_id, page)
+    with SETTINGS_LOCK:
+        pending = PENDING_SAVES.get(key)
+        # Identical settings are only queued again to retry a failed write
+        if pending and pending[1] == digest and key in SAVE_TIMERS:
+            return False
+        if not pending and persisted_hash(user_id, page) == digest:
+            return False
+
+        # Copy so later edits to session state do not leak into the write
+        PENDING_SAVES[key] = (copy_settings(settings), digest)
+        timer = SAVE_TIMERS.pop(key, None)
+        if timer:
+            timer.cancel()
+        timer = threading.Timer(SETTINGS_SAVE_DELAY, flush_settings, args=key)
+        timer.daemon = True
+        SAVE_TIMERS[key] = timer
+        timer.start()
+    return True
+
+atexit.register(flush_pending_settings)
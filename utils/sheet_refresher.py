@@ -0,0 +1,91 @@
+import logging
+import os
+import threading
+
+import streamlit as st
+
+from utils.settings_manager import get_default_settings
+
+# Seconds between refresh passes over the registered spreadsheets
+REFRESH_INTERVAL = int(os.getenv('SHEET_REFRESH_INTERVAL', '60'))
+
+# Seconds the server's refresher waits before its first pass, so importing the
+# sheet pipeline does not compete for the GIL with the first page renders
+REFRESH_START_DELAY = float(os.getenv('SHEET_REFRESH_START_DELAY', '5'))
+
+logger = logging.getLogger(__name__)
+
+def register_default_ranges():
+    """Register the default Alerts and Signals ranges so they are warmed and kept current."""
+    # utils.gsheets pulls in pandas and the sheet pipeline; import it off the script thread
+    from utils.gsheets import build_range_name, register_sheet_range
+
+    for page, incremental in (('alerts', True), ('signals', False)):
+        settings = get_default_settings(page)
+        register_sheet_range(
+            settings['spreadsheet_id'],
+            build_range_name(
+                settings['sheet_name'], settings['start_col'], settings['start_row'],
+                # The append-only alert log is read to its last row
+                settings['end_col'], None if incremental else settings['end_row']
+            ),
+            incremental=incremental
+        )
+
+def refresh_all_sheets():
+    """Refresh and publish every recently requested range once (idle ranges expire)."""
+    from utils.gsheets import (
+        get_all_registered_ranges, get_google_clients, get_spreadsheet_revision, refresh_stale_ranges
+    )
+
+    service = get_google_clients()[0]
+    for spreadsheet_id in get_all_registered_ranges():
+        try:
+            revision = get_spreadsheet_revision(spreadsheet_id)
+            refresh_stale_ranges(service, spreadsheet_id, revision)
+        except Exception:
+            logger.exception("Failed to refresh spreadsheet %s", spreadsheet_id)
+
+def run_refresher(interval=REFRESH_INTERVAL, stop_event=None, start_delay=0):
+    """Refresh the registered sheets every `interval` seconds until stopped."""
+    stop_event = stop_event or threading.Event()
+    if stop_event.wait(start_delay):
+        return
+
+    while not stop_event.is_set():
+        # Re-registered every pass so the default ranges never expire as idle,
+        # even in the standalone worker where no page requests them
+        try:
+            register_default_ranges()
+        except Exception:
+            # Pages still register their own ranges, so keep refreshing those
+            logger.exception("Failed to register the default sheet ranges")
+
+        try:
+            refresh_all_sheets()
+        except Exception:
+            logger.exception("Sheet refresh failed")
+        stop_event.wait(interval)
+
+@st.cache_resource
+def start_sheet_refresher():
+    """Start the background refresher thread once per server process.
+
+    Its first pass runs REFRESH_START_DELAY seconds after boot and warms the
+    cache. The sheet pipeline is imported on that thread; the delay keeps the
+    import from competing for the GIL with the first page renders, which only
+    import it themselves once a user logs in.
+    """
+    thread = threading.Thread(
+        target=run_refresher,
+        kwargs={'start_delay': REFRESH_START_DELAY},
+        name="sheet-refresher",
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    # Standalone worker: keeps the on-disk snapshots current for the server
+    logging.basicConfig(level=logging.INFO)
+    run_refresher()
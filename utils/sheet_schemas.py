@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+# Column kinds: 'numeric', 'date', 'categorical' (low-cardinality labels) and 'text'.
+# Columns that are not declared here are inferred as numeric or text.
+SHEET_SCHEMAS = {
+    'ALERTS': {
+        'Ticker': 'categorical',
+        'Name': 'categorical',
+        'Description': 'text',
+        'Date': 'date'
+    },
+    'SIGNALS': {
+        'Ticker': 'text',
+        'Current TPI Signal': 'numeric',
+        'Last TPI Flip': 'categorical',
+        'Before Last TPI Flip': 'categorical',
+        '1M Momentum': 'categorical',
+        'Quad Territory': 'categorical',
+        'Quad for Last Qtr': 'numeric',
+        'Quad for this Qtr': 'numeric',
+        'Quad for next Qtr': 'numeric',
+        'Quad for Qtr +2': 'numeric',
+        'TPI -7': 'numeric',
+        'TPI -6': 'numeric',
+        'TPI -5': 'numeric',
+        'TPI -4': 'numeric',
+        'TPI -3': 'numeric',
+        'TPI -2': 'numeric',
+        'TPI -1': 'numeric',
+        'TPI Latest': 'numeric',
+        'TPI Slope': 'numeric',
+        'TPI MA': 'numeric'
+    }
+}
+
+# Day zero of Google Sheets date serial numbers
+SERIAL_EPOCH = pd.Timestamp('1899-12-30')
+
+def get_sheet_schema(sheet_name):
+    """Return the declared column kinds for a sheet (empty if undeclared)."""
+    return SHEET_SCHEMAS.get(sheet_name, {})
+
+def is_missing(series):
+    """Mask of empty cells: None/NaN or empty strings."""
+    return series.isna() | series.eq('')
+
+def infer_kind(series):
+    """Infer 'numeric' if every non-empty cell is a number, otherwise 'text'."""
+    present = ~is_missing(series)
+    numeric = pd.to_numeric(series.where(present), errors='coerce')
+    return 'numeric' if numeric.notna().sum() == present.sum() else 'text'
+
+def column_kinds(df):
+    """Derive column kinds from a typed DataFrame's dtypes."""
+    kinds = {}
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            kinds[col] = 'date'
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            kinds[col] = 'numeric'
+        else:
+            kinds[col] = 'text'
+    return kinds
+
+def convert_column(series, kind):
+    """Convert a raw column of sheet values to the given kind.
+
+    Cells that cannot be converted become missing values.
+    """
+    present = ~is_missing(series)
+
+    if kind == 'numeric':
+        return pd.to_numeric(series.where(present), errors='coerce')
+
+    if kind == 'date':
+        values = series.where(present)
+        serials = pd.to_numeric(values, errors='coerce')
+        dates = (SERIAL_EPOCH + pd.to_timedelta(serials, unit='D')).dt.round('s')
+        # Cells stored as text in the sheet still come back as strings
+        text_mask = values.notna() & serials.isna()
+        if text_mask.any():
+            text_dates = pd.to_datetime(values.where(text_mask), errors='coerce', format='mixed')
+            dates = dates.where(~text_mask, text_dates)
+        return dates
+
+    # Text and categorical labels: keep empty cells, stringify everything else
+    text = series.astype(object)
+    present = text.notna()
+    text[present] = text[present].astype(str)
+    return text
+
+def apply_schema(df, schema):
+    """Convert every column of a raw frame in one pass.
+
+    Columns missing from the schema are inferred as numeric or text.
+    """
+    if df.columns.empty:
+        return df
+
+    columns = []
+    for position, col in enumerate(df.columns):
+        series = df.iloc[:, position]
+        columns.append(convert_column(series, schema.get(col) or infer_kind(series)))
+
+    typed_df = pd.concat(columns, axis=1)
+    typed_df.columns = df.columns
+    return typed_df
+
+def unparsed_columns(raw_df, typed_df):
+    """Return the columns where a non-empty raw cell failed to convert."""
+    failed = (~is_missing(raw_df)) & typed_df.isna()
+    return list(typed_df.columns[np.asarray(failed.any())])
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Directory for parsed sheet snapshots (Arrow IPC / Feather v2 files)
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+
+# Refetch a snapshot after this many seconds even if the revision looks unchanged
+SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', '3600'))
+
+# Serve published snapshots from memory for this many seconds before rechecking
+PUBLISH_TTL = int(os.getenv('SNAPSHOT_PUBLISH_TTL', '300'))
+
+_META_KEY = b'wealthelf_snapshot'
+
+# Memory budget for published frames; the least recently used are dropped first
+PUBLISH_MAX_BYTES = int(os.getenv('SNAPSHOT_PUBLISH_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Parsed frames ready for page renders, keyed by (spreadsheet_id, range_name),
+# mapped to (frame, meta, published_at, bytes), least recently used first
+PUBLISHED_SNAPSHOTS = OrderedDict()
+PUBLISHED_LOCK = threading.Lock()
+
+# Memory budget for structures derived from snapshots (default 256 MB)
+ARTIFACT_MAX_BYTES = int(os.getenv('SNAPSHOT_ARTIFACT_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Structures derived from snapshots (search indexes, sort orders, ...), mapped
+# to (artifact, bytes), least recently used first
+SNAPSHOT_ARTIFACTS = OrderedDict()
+ARTIFACTS_LOCK = threading.Lock()
+
+# Snapshots fetched before this time are treated as stale (see expire_snapshots)
+expired_before = 0.0
+
+def snapshot_path(spreadsheet_id: str, range_name: str) -> str:
+    """Return the snapshot file path for a spreadsheet range."""
+    key = hashlib.sha1(f"{spreadsheet_id}|{range_name}".encode('utf-8')).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{key}.arrow")
+
+def read_snapshot(spreadsheet_id: str, range_name: str) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, Any]]]:
+    """Read a snapshot from disk using a memory-mapped file.
+
+    Returns (DataFrame, metadata), or (None, None) if no usable snapshot exists.
+    """
+    path = snapshot_path(spreadsheet_id, range_name)
+    if not os.path.exists(path):
+        return None, None
+
+    try:
+        table = feather.read_table(path, memory_map=True)
+        meta = json.loads((table.schema.metadata or {})[_META_KEY])
+        df = table.to_pandas()
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None, None
+
+    df.attrs['snapshot_version'] = meta['version']
+    return df, meta
+
+def read_snapshot_meta(spreadsheet_id: str, range_name: str) -> Optional[Dict[str, Any]]:
+    """Read only the metadata of a snapshot, without loading its data."""
+    path = snapshot_path(spreadsheet_id, range_name)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with pa.memory_map(path, 'r') as source:
+            schema = pa.ipc.open_file(source).schema
+        return json.loads((schema.metadata or {})[_META_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+def write_snapshot(
+    spreadsheet_id: str,
+    range_name: str,
+    df: pd.DataFrame,
+    revision: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Persist and publish a parsed DataFrame as a snapshot, returning its metadata.
+
+    Frames Arrow cannot represent (e.g. duplicate column names) are only
+    published in memory.
+    """
+    fetched_at = time.time()
+    meta = {
+        'spreadsheet_id': spreadsheet_id,
+        'range_name': range_name,
+        'revision': revision,
+        'fetched_at': fetched_at,
+        'version': hashlib.sha1(
+            f"{spreadsheet_id}|{range_name}|{revision}|{fetched_at}".encode('utf-8')
+        ).hexdigest()[:16],
+        **(extra or {})
+    }
+
+    path = snapshot_path(spreadsheet_id, range_name)
+    tmp_path = None
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        # A temp file of its own, so concurrent writers of one range cannot interleave
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.tmp')
+        os.close(fd)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            _META_KEY: json.dumps(meta).encode('utf-8')
+        })
+        # Uncompressed so that reads can be served straight from the memory map
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, pa.ArrowException):
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    df.attrs['snapshot_version'] = meta['version']
+    publish_snapshot(spreadsheet_id, range_name, df, meta)
+    return meta
+
+def is_snapshot_current(meta: Optional[Dict[str, Any]], revision: Optional[str]) -> bool:
+    """Check whether a snapshot matches the spreadsheet's current revision.
+
+    When the revision is unknown (the Drive lookup failed), a snapshot is
+    trusted until it is PUBLISH_TTL seconds old instead of being refetched
+    on every pass.
+    """
+    if not meta:
+        return False
+    if meta.get('fetched_at', 0) <= expired_before:
+        return False
+    age = time.time() - meta.get('fetched_at', 0)
+    if revision is None:
+        return age < min(PUBLISH_TTL, SNAPSHOT_MAX_AGE)
+    if meta.get('revision') != revision:
+        return False
+    return age < SNAPSHOT_MAX_AGE
+
+def publish_snapshot(spreadsheet_id: str, range_name: str, df: pd.DataFrame, meta: Dict[str, Any]) -> None:
+    """Make a snapshot available to page renders without any disk or API access.
+
+    Frames beyond PUBLISH_MAX_BYTES are dropped least recently used first;
+    they are still served from their on-disk snapshot.
+    """
+    key = (spreadsheet_id, range_name)
+    entry = (df.copy(), meta, time.time(), int(df.memory_usage(deep=True).sum()))
+    with PUBLISHED_LOCK:
+        PUBLISHED_SNAPSHOTS[key] = entry
+        PUBLISHED_SNAPSHOTS.move_to_end(key)
+        total_bytes = sum(published[3] for published in PUBLISHED_SNAPSHOTS.values())
+        while total_bytes > PUBLISH_MAX_BYTES and len(PUBLISHED_SNAPSHOTS) > 1:
+            _, evicted = PUBLISHED_SNAPSHOTS.popitem(last=False)
+            total_bytes -= evicted[3]
+
+def unpublish_snapshot(spreadsheet_id: str, range_name: str) -> None:
+    """Drop a published snapshot from memory, e.g. when its range is unregistered."""
+    with PUBLISHED_LOCK:
+        PUBLISHED_SNAPSHOTS.pop((spreadsheet_id, range_name), None)
+
+def touch_published_snapshot(spreadsheet_id: str, range_name: str, version: str) -> bool:
+    """Mark a published snapshot as still current.
+
+    Returns False if the published snapshot is missing or has another version.
+    """
+    with PUBLISHED_LOCK:
+        entry = PUBLISHED_SNAPSHOTS.get((spreadsheet_id, range_name))
+        if not entry or entry[1]['version'] != version:
+            return False
+        PUBLISHED_SNAPSHOTS[(spreadsheet_id, range_name)] = (entry[0], entry[1], time.time(), entry[3])
+        return True
+
+def get_published_snapshot(spreadsheet_id: str, range_name: str) -> Optional[pd.DataFrame]:
+    """Return a copy of a published snapshot, or None if it is missing or too old."""
+    with PUBLISHED_LOCK:
+        entry = PUBLISHED_SNAPSHOTS.get((spreadsheet_id, range_name))
+        if entry:
+            PUBLISHED_SNAPSHOTS.move_to_end((spreadsheet_id, range_name))
+    if not entry or time.time() - entry[2] > PUBLISH_TTL:
+        return None
+    return entry[0].copy()
+
+def expire_snapshots() -> None:
+    """Force every snapshot to be refetched, keeping the files as a fallback."""
+    global expired_before
+    expired_before = time.time()
+    with PUBLISHED_LOCK:
+        PUBLISHED_SNAPSHOTS.clear()
+
+def artifact_size(artifact: Any) -> int:
+    """Estimate the memory held by an artifact in bytes."""
+    if isinstance(artifact, pd.DataFrame):
+        return int(artifact.memory_usage(deep=True).sum())
+    if isinstance(artifact, (pd.Series, pd.Index)):
+        return int(artifact.memory_usage(deep=True))
+    if isinstance(artifact, np.ndarray):
+        return artifact.nbytes
+    if isinstance(artifact, dict):
+        return sys.getsizeof(artifact) + sum(
+            artifact_size(key) + artifact_size(value) for key, value in artifact.items()
+        )
+    if isinstance(artifact, (list, tuple, set, frozenset)):
+        return sys.getsizeof(artifact) + sum(artifact_size(item) for item in artifact)
+    if hasattr(artifact, '__dict__'):
+        return sys.getsizeof(artifact) + artifact_size(vars(artifact))
+    return sys.getsizeof(artifact)
+
+def get_snapshot_artifact(df: pd.DataFrame, name: Any, build) -> Any:
+    """Return a structure derived from a snapshot frame, building it once per version.
+
+    `build(df)` is called on the first request for a snapshot version. Frames
+    that do not come from a snapshot return None. A None result is not
+    cached, and artifacts are evicted least recently used first once they
+    exceed ARTIFACT_MAX_BYTES.
+    """
+    version = df.attrs.get('snapshot_version')
+    if version is None:
+        return None
+
+    # Row positions must line up with the snapshot the artifact was built from
+    key = (version, len(df), name)
+    with ARTIFACTS_LOCK:
+        if key in SNAPSHOT_ARTIFACTS:
+            SNAPSHOT_ARTIFACTS.move_to_end(key)
+            return SNAPSHOT_ARTIFACTS[key][0]
+
+    artifact = build(df)
+    if artifact is None:
+        return None
+    size = artifact_size(artifact)
+    if size > ARTIFACT_MAX_BYTES:
+        return artifact
+
+    with ARTIFACTS_LOCK:
+        SNAPSHOT_ARTIFACTS[key] = (artifact, size)
+        total_bytes = sum(entry[1] for entry in SNAPSHOT_ARTIFACTS.values())
+        while total_bytes > ARTIFACT_MAX_BYTES:
+            total_bytes -= SNAPSHOT_ARTIFACTS.popitem(last=False)[1][1]
+    return artifact
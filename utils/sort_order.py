@@ -0,0 +1,41 @@
+import numpy as np
+
+from utils.snapshot_cache import get_snapshot_artifact
+
+def sort_columns(sort_by):
+    """Normalize a sort spec (column name or list of names) to a tuple."""
+    if not sort_by:
+        return ()
+    if isinstance(sort_by, str):
+        return (sort_by,)
+    return tuple(sort_by)
+
+def sort_directions(ascending, columns):
+    """Normalize a sort direction (bool or list of bools) to one bool per column."""
+    if isinstance(ascending, (list, tuple)):
+        return tuple(bool(value) for value in ascending)
+    return (bool(ascending),) * len(columns)
+
+def stable_sort_positions(df, sort_by, ascending=True, na_position='last'):
+    """Return the row positions of a frame in stable sorted order."""
+    columns = list(sort_columns(sort_by))
+    ordered = df[columns].reset_index(drop=True).sort_values(
+        columns,
+        ascending=list(sort_directions(ascending, columns)),
+        kind='stable',
+        na_position=na_position
+    )
+    return ordered.index.to_numpy(dtype=np.intp)
+
+def get_sort_order(df, sort_by, ascending=True, na_position='last'):
+    """Return the snapshot's stable sort permutation for a sort spec, computing it once.
+
+    Returns None when the frame is not a cached snapshot.
+    """
+    columns = sort_columns(sort_by)
+    directions = sort_directions(ascending, columns)
+
+    def build(snapshot_df):
+        return stable_sort_positions(snapshot_df, columns, directions, na_position)
+
+    return get_snapshot_artifact(df, ('sort_order', columns, directions, na_position), build)
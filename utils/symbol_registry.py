@@ -0,0 +1,127 @@
+import difflib
+import threading
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from utils.database import fetch_market_symbols, get_symbols_version
+from utils.snapshot_cache import get_snapshot_artifact
+
+# Symbol metadata attached to sheet frames: registry field -> frame column
+ENRICHED_COLUMNS = {
+    'description': 'Description'
+}
+
+def normalize_symbol(symbol):
+    """Normalize a ticker for lookups: trimmed and upper-case."""
+    return str(symbol).strip().upper()
+
+class SymbolRegistry:
+    """In-memory market symbol dictionary.
+
+    Symbols are keyed by their normalized form for constant-time description
+    lookup, and kept sorted for prefix search.
+    """
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.entries = {}  # normalized symbol -> (symbol, description)
+        for row in rows:
+            self.entries[normalize_symbol(row['symbol'])] = (row['symbol'], row['description'] or '')
+        self.keys = sorted(self.entries)
+        self.metadata = pd.DataFrame(
+            {'description': [self.entries[key][1] for key in self.keys]},
+            index=pd.Index(self.keys)
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, symbol):
+        """Return the description of a symbol, or None if it is unknown."""
+        entry = self.entries.get(normalize_symbol(symbol))
+        return entry[1] if entry else None
+
+    def prefix_search(self, prefix, limit=10):
+        """Return up to limit (symbol, description) pairs starting with the prefix."""
+        prefix = normalize_symbol(prefix)
+        if not prefix:
+            return []
+
+        matches = []
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(matches) < limit:
+            key = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            matches.append(self.entries[key])
+            position += 1
+        return matches
+
+    def fuzzy_search(self, text, limit=5, cutoff=0.6):
+        """Return up to limit (symbol, description) pairs closest to a misspelled symbol."""
+        keys = difflib.get_close_matches(normalize_symbol(text), self.keys, n=limit, cutoff=cutoff)
+        return [self.entries[key] for key in keys]
+
+SYMBOL_REGISTRY = None
+REGISTRY_LOCK = threading.Lock()
+
+def get_symbol_registry():
+    """Return the process-wide symbol registry, reloading it after symbol imports."""
+    global SYMBOL_REGISTRY
+    with REGISTRY_LOCK:
+        version = get_symbols_version()
+        if SYMBOL_REGISTRY is None or SYMBOL_REGISTRY.version != version:
+            SYMBOL_REGISTRY = SymbolRegistry(fetch_market_symbols(), version)
+        return SYMBOL_REGISTRY
+
+def normalize_tickers(series):
+    """Vectorized normalize_symbol for a column of tickers (missing stays missing)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    present = series.notna()
+    keys = pd.Series(None, index=series.index, dtype=object)
+    keys[present] = series[present].astype(str).str.strip().str.upper()
+    return keys
+
+def join_symbol_metadata(df, registry, ticker_column='Ticker'):
+    """Attach symbol metadata columns to a frame with a hash join on the ticker.
+
+    Columns the frame already has are left as they are. Returns a new frame.
+    """
+    columns = {field: column for field, column in ENRICHED_COLUMNS.items() if column not in df.columns}
+    if ticker_column not in df.columns or not columns:
+        return df
+
+    positions = registry.metadata.index.get_indexer(normalize_tickers(df[ticker_column]))
+    matched = positions >= 0
+
+    enriched = df.copy(deep=False)
+    insert_at = df.columns.get_loc(ticker_column) + 1
+    for field, column in columns.items():
+        values = np.full(len(df), None, dtype=object)
+        values[matched] = registry.metadata[field].to_numpy()[positions[matched]]
+        enriched.insert(insert_at, column, pd.Categorical(values))
+        insert_at += 1
+    return enriched
+
+def enrich_with_symbols(df, registry, ticker_column='Ticker'):
+    """Return the frame with symbol metadata attached, joined once per snapshot and registry version.
+
+    The enriched frame gets its own snapshot version, so filters, sorts and
+    cached views built on it stay separate from the plain snapshot. It is
+    shared between sessions and must not be modified.
+    """
+    version = df.attrs.get('snapshot_version')
+
+    def build(snapshot_df):
+        enriched = join_symbol_metadata(snapshot_df, registry, ticker_column)
+        if enriched is not snapshot_df:
+            enriched.attrs['snapshot_version'] = f"{version}+symbols{registry.version}"
+        return enriched
+
+    enriched = get_snapshot_artifact(df, ('symbol_enrichment', ticker_column, registry.version), build)
+    if enriched is None:
+        enriched = join_symbol_metadata(df, registry, ticker_column)
+    return enriched
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on the memory held by cached views (default 256 MB)
+VIEW_CACHE_MAX_BYTES = int(os.getenv('VIEW_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+class ViewCache:
+    """Thread-safe LRU cache of derived DataFrame views, bounded by size in bytes.
+
+    Cached frames are shared between sessions and must not be modified.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached view for a key, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df):
+        """Cache a view, evicting the least recently used ones to stay within budget."""
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (df, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self.total_bytes -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        """Drop every cached view."""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current usage."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes
+            }
+
+# Process-wide cache shared by every session
+VIEW_CACHE = ViewCache(VIEW_CACHE_MAX_BYTES)
+
+def normalize_filters(filters):
+    """Serialize a filter dict into a stable cache key, ignoring empty filters."""
+    active = {column: value for column, value in (filters or {}).items() if value}
+    return json.dumps(active, sort_keys=True, default=str)